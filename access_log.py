@@ -0,0 +1,135 @@
+"""
+Access log parsers for request metrics.
+
+Each parser turns one log line into an AccessRecord (method, path, status,
+latency in seconds, bytes, timestamp) or None when the line is not an access
+log entry. Parsers are precompiled once and chosen per pod with the
+"k8s-dashboard/log-format" annotation (nginx, envoy or json; nginx by
+default). Extra formats can be added with register_parser().
+"""
+
+import re
+import json
+from collections import namedtuple
+
+from path_normalizer import default_normalizer
+
+FORMAT_ANNOTATION = 'k8s-dashboard/log-format'
+DEFAULT_FORMAT = 'nginx'
+
+AccessRecord = namedtuple('AccessRecord', 'method path status latency bytes timestamp')
+# tuple.__new__ skips the namedtuple constructor's argument handling on the hot path
+_record = tuple.__new__
+
+
+class RegexParser:
+    """Parser for one precompiled line format.
+
+    The pattern's groups must be, in order: timestamp, method, path, status,
+    bytes and latency (latency may be an optional group).
+    """
+
+    def __init__(self, name, pattern, latency_scale=1.0):
+        self.name = name
+        self.latency_scale = latency_scale
+        self._match = re.compile(pattern).match
+
+    def parse(self, line):
+        m = self._match(line)
+        if m is None:
+            return None
+        timestamp, method, path, status, size, took = m.groups()
+        return _record(AccessRecord, (
+            method,
+            path,
+            int(status),
+            float(took) * self.latency_scale if took else None,
+            int(size) if size and size != '-' else 0,
+            timestamp
+        ))
+
+
+class JsonParser:
+    """Parser for JSON access logs, trying common field names"""
+
+    FIELDS = {
+        'method': ('method', 'request_method', 'http_method'),
+        'path': ('path', 'uri', 'request_uri', 'url'),
+        'status': ('status', 'status_code', 'response_code'),
+        'latency': ('request_time', 'latency', 'duration'),
+        'bytes': ('bytes_sent', 'body_bytes_sent', 'bytes'),
+        'timestamp': ('time', 'timestamp', 'time_iso8601', 'start_time')
+    }
+
+    def __init__(self, name='json', latency_scale=1.0):
+        self.name = name
+        self.latency_scale = latency_scale
+
+    @staticmethod
+    def _field(entry, names):
+        for name in names:
+            if name in entry:
+                return entry[name]
+        return None
+
+    def parse(self, line):
+        if not line.startswith('{'):
+            return None
+        try:
+            entry = json.loads(line)
+            status = int(self._field(entry, self.FIELDS['status']))
+        except (ValueError, TypeError):
+            return None
+        method = self._field(entry, self.FIELDS['method'])
+        path = self._field(entry, self.FIELDS['path'])
+        if not method or not path:
+            return None
+        latency = self._field(entry, self.FIELDS['latency'])
+        size = self._field(entry, self.FIELDS['bytes'])
+        try:
+            latency = float(latency) * self.latency_scale if latency is not None else None
+            size = int(size) if size not in (None, '-') else 0
+        except (ValueError, TypeError):
+            latency, size = None, 0
+        return AccessRecord(method, path, status, latency, size, self._field(entry, self.FIELDS['timestamp']))
+
+
+# nginx "combined", optionally followed by $request_time
+NGINX = RegexParser(
+    'nginx',
+    r'\S+ \S+ \S+ \[([^\]]*)\] "([A-Z]+) ([^ "]*)[^"]*" (\d{3}) (\d+|-)'
+    r'(?: "[^"]*" "[^"]*" ([\d.]+))?'
+)
+
+# envoy default access log format; DURATION is in milliseconds
+ENVOY = RegexParser(
+    'envoy',
+    r'\[([^\]]*)\] "([A-Z]+) ([^ "]*)[^"]*" (\d{3}) \S+ \d+ (\d+) (\d+)',
+    latency_scale=0.001
+)
+
+PARSERS = {
+    'nginx': NGINX,
+    'envoy': ENVOY,
+    'json': JsonParser()
+}
+
+
+def register_parser(name, parser):
+    """Make a parser selectable through the log-format annotation"""
+    PARSERS[name] = parser
+
+
+def parser_for_pod(pod):
+    """Return the parser named by the pod's log-format annotation"""
+    annotations = pod.metadata.annotations or {}
+    return PARSERS.get(annotations.get(FORMAT_ANNOTATION, DEFAULT_FORMAT), PARSERS[DEFAULT_FORMAT])
+
+
+def route_template(path):
+    """Group request paths into routes for per-endpoint metrics"""
+    return default_normalizer.normalize(path)
+
+
+def is_failure(record):
+    return record.status >= 400
@@ -3,13 +3,15 @@ import json
 import logging
 from kubernetes import client
 from datetime import datetime
+from endpoints_index import index_endpoints
 
 logger = logging.getLogger(__name__)
 
 class K8sAIChatbot:
-    def __init__(self, v1_api, apps_v1_api):
+    def __init__(self, v1_api, apps_v1_api, cluster_cache=None):
         self.v1 = v1_api
         self.apps_v1 = apps_v1_api
+        self.cluster_cache = cluster_cache
         self.conversation_history = []
         try:
             self.bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
@@ -19,21 +21,28 @@ class K8sAIChatbot:
             self.ai_enabled = False
             logger.warning(f"AI not available: {e}")
     
+    def _list(self, kind, list_func):
+        """List objects from the shared cluster cache when available"""
+        if self.cluster_cache:
+            return self.cluster_cache.list(kind)
+        return list_func().items
+    
     def get_detailed_cluster_context(self):
         """Get comprehensive cluster state for AI context"""
         try:
-            pods = self.v1.list_pod_for_all_namespaces()
-            services = self.v1.list_service_for_all_namespaces()
-            deployments = self.apps_v1.list_deployment_for_all_namespaces()
-            nodes = self.v1.list_node()
-            namespaces = self.v1.list_namespace()
+            pods = self._list('pods', self.v1.list_pod_for_all_namespaces)
+            services = self._list('services', self.v1.list_service_for_all_namespaces)
+            deployments = self._list('deployments', self.apps_v1.list_deployment_for_all_namespaces)
+            nodes = self._list('nodes', self.v1.list_node)
+            namespaces = self._list('namespaces', self.v1.list_namespace)
+            endpoints = index_endpoints(self._list('endpoints', self.v1.list_endpoints_for_all_namespaces))
             
             # Detailed pod analysis
             pod_status = {'Running': 0, 'Pending': 0, 'Failed': 0, 'CrashLoopBackOff': 0, 'Unknown': 0}
             pod_issues = []
             restart_issues = []
             
-            for p in pods.items:
+            for p in pods:
                 phase = p.status.phase
                 pod_status[phase] = pod_status.get(phase, 0) + 1
                 
@@ -57,7 +66,7 @@ class K8sAIChatbot:
             # Node analysis
             node_status = {'Ready': 0, 'NotReady': 0}
             node_issues = []
-            for n in nodes.items:
+            for n in nodes:
                 ready = any(c.type == 'Ready' and c.status == 'True' for c in n.status.conditions)
                 node_status['Ready' if ready else 'NotReady'] += 1
                 
@@ -71,7 +80,7 @@ class K8sAIChatbot:
             
             # Deployment analysis
             deploy_issues = []
-            for d in deployments.items:
+            for d in deployments:
                 ready = d.status.ready_replicas or 0
                 desired = d.spec.replicas or 0
                 if ready < desired:
@@ -79,21 +88,18 @@ class K8sAIChatbot:
             
             # Service analysis
             svc_without_endpoints = []
-            for svc in services.items:
-                try:
-                    endpoints = self.v1.read_namespaced_endpoints(svc.metadata.name, svc.metadata.namespace)
-                    if not endpoints.subsets or not any(s.addresses for s in endpoints.subsets):
-                        svc_without_endpoints.append(f"{svc.metadata.namespace}/{svc.metadata.name}")
-                except:
-                    pass
+            for svc in services:
+                svc_key = f"{svc.metadata.namespace}/{svc.metadata.name}"
+                if svc_key in endpoints and not endpoints[svc_key]:
+                    svc_without_endpoints.append(svc_key)
             
             context = f"""=== CLUSTER OVERVIEW ===
 Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-Namespaces: {len(namespaces.items)}
-Nodes: {len(nodes.items)} ({node_status['Ready']} ready, {node_status['NotReady']} not ready)
-Pods: {len(pods.items)} (Running: {pod_status.get('Running', 0)}, Pending: {pod_status.get('Pending', 0)}, Failed: {pod_status.get('Failed', 0)})
-Deployments: {len(deployments.items)} ({len(deploy_issues)} unhealthy)
-Services: {len(services.items)} ({len(svc_without_endpoints)} without endpoints)
+Namespaces: {len(namespaces)}
+Nodes: {len(nodes)} ({node_status['Ready']} ready, {node_status['NotReady']} not ready)
+Pods: {len(pods)} (Running: {pod_status.get('Running', 0)}, Pending: {pod_status.get('Pending', 0)}, Failed: {pod_status.get('Failed', 0)})
+Deployments: {len(deployments)} ({len(deploy_issues)} unhealthy)
+Services: {len(services)} ({len(svc_without_endpoints)} without endpoints)
 
 === CRITICAL ISSUES ==="""
             
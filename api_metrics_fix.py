@@ -69,40 +69,6 @@ def get_request_metrics():
 
 
 # PROMETHEUS-BASED IMPLEMENTATION (Better Performance)
-
-class PrometheusMetrics:
-    """Add to prometheus_client.py"""
-    
-    def get_api_request_metrics(self, namespace=None, pod=None, duration='5m'):
-        """Get API request metrics with dynamic filtering"""
-        
-        # Build filter
-        filters = []
-        if namespace:
-            filters.append(f'namespace="{namespace}"')
-        if pod:
-            filters.append(f'pod="{pod}"')
-        filter_str = ','.join(filters)
-        
-        # Queries
-        submit_query = f'sum(rate(http_requests_total{{{filter_str}}}[{duration}]))'
-        delivered_query = f'sum(rate(http_requests_total{{{filter_str},status=~"2.."}}[{duration}]))'
-        failure_query = f'sum(rate(http_requests_total{{{filter_str},status=~"[45].."}}[{duration}]))'
-        
-        submit = self.query(submit_query)
-        delivered = self.query(delivered_query)
-        failure = self.query(failure_query)
-        
-        return {
-            'submit': self._extract_value(submit),
-            'delivered': self._extract_value(delivered),
-            'failure': self._extract_value(failure)
-        }
-    
-    def _extract_value(self, result):
-        """Extract scalar value from Prometheus result"""
-        if result and result.get('status') == 'success':
-            data = result.get('data', {}).get('result', [])
-            if data:
-                return float(data[0].get('value', [0, 0])[1])
-        return 0
+# Implemented as PrometheusClient.get_api_request_metrics in prometheus_client.py;
+# /api/request-metrics and /api/failure-details use it when Prometheus is connected
+# (see REQUEST_METRICS_SOURCE in k8s_dashboard_server_updated.py).
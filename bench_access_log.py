@@ -0,0 +1,78 @@
+"""
+Micro-benchmark for the access log parsers.
+
+Parses synthetic nginx, envoy and JSON lines on one core and reports lines
+per second, next to the substring checks the request metrics used before.
+The "+ classify" rows add the failure check and route templating that the
+log cursor and tailer run on every record.
+
+Usage:
+    python bench_access_log.py                # 1M lines per format
+    python bench_access_log.py 200000 --repeat 5
+"""
+
+import argparse
+import time
+
+from access_log import PARSERS, is_failure, route_template
+
+SAMPLES = {
+    'nginx': '10.0.{a}.{b} - - [18/Oct/2026:10:00:{s:02d} +0000] "{m} /api/v1/items/{b}?page=2 HTTP/1.1" {st} {sz} "-" "curl/8.4.0" 0.0{b:02d}',
+    'envoy': '[2026-10-18T10:00:{s:02d}.310Z] "{m} /api/v1/items/{b} HTTP/2" {st} - 154 {sz} {b} 8 "10.0.35.28" "curl/8.4.0" "cc21d9b0" "items" "tcp://10.0.2.1:80"',
+    'json': '{{"time": "2026-10-18T10:00:{s:02d}+00:00", "method": "{m}", "path": "/api/v1/items/{b}", "status": {st}, "request_time": 0.0{b:02d}, "bytes_sent": {sz}}}'
+}
+METHODS = ('GET', 'POST', 'PUT', 'DELETE', 'PATCH')
+STATUSES = (200, 200, 200, 201, 204, 301, 404, 500, 502, 503)
+
+
+def make_lines(fmt, count):
+    template = SAMPLES[fmt]
+    return [template.format(a=i % 250, b=i % 97, s=i % 60, m=METHODS[i % 5], st=STATUSES[i % 10], sz=200 + i % 900)
+            for i in range(count)]
+
+
+def substring_baseline(line):
+    # The heuristic used by request metrics before the parser module
+    if 'HTTP' in line and ('GET /' in line or 'POST /' in line or '"GET /' in line or '"POST /' in line):
+        return ' 200 ' in line or ' 404 ' in line or ' 500 ' in line or ' 503 ' in line
+    return None
+
+
+def classified(parse):
+    """parse plus the per-record work done when counting a line"""
+    def ingest(line):
+        record = parse(line)
+        if record:
+            is_failure(record)
+            route_template(record.path)
+        return record
+    return ingest
+
+
+def run(name, func, lines, repeat):
+    best = None
+    parsed = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parsed = sum(1 for line in lines if func(line))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<22} {len(lines) / best / 1e6:>6.2f} M lines/s  ({parsed} of {len(lines)} matched)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('lines', nargs='?', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    nginx_lines = make_lines('nginx', args.lines)
+    run('substring (before)', substring_baseline, nginx_lines, args.repeat)
+    for fmt in SAMPLES:
+        lines = nginx_lines if fmt == 'nginx' else make_lines(fmt, args.lines)
+        parser = PARSERS[fmt]
+        run(fmt, parser.parse, lines, args.repeat)
+        run(f"{fmt} + classify", classified(parser.parse), lines, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Micro-benchmark for TopologyBuilder.build_graph on synthetic clusters.
+
+Builds clusters of increasing size entirely in memory (no API server is
+contacted) and reports build time per object. A linear build keeps the
+per-object time roughly flat as the cluster grows.
+
+Usage:
+    python bench_topology.py                 # 2.5k, 5k, 10k and 20k objects
+    python bench_topology.py 10000 --repeat 5
+"""
+
+import argparse
+import time
+
+from kubernetes import client
+
+from topology_backend import TopologyBuilder
+
+
+def make_cluster(total_objects):
+    """Return synthetic cluster objects, roughly total_objects in all"""
+    # Proportions loosely follow a production cluster: mostly pods, a
+    # service per deployment and ~3 ReplicaSets (2 historical) per deployment.
+    n_deploy = max(1, total_objects // 20)
+    n_ns = max(1, n_deploy // 25)
+    n_nodes = max(1, n_deploy // 10)
+    pods_per_deploy = 12
+
+    namespaces = [client.V1Namespace(metadata=client.V1ObjectMeta(name=f"ns-{i}"),
+                                     status=client.V1NamespaceStatus(phase='Active'))
+                  for i in range(n_ns)]
+    k8s_nodes = [client.V1Node(
+        metadata=client.V1ObjectMeta(name=f"node-{i}"),
+        status=client.V1NodeStatus(
+            conditions=[client.V1NodeCondition(type='Ready', status='True')],
+            addresses=[client.V1NodeAddress(type='InternalIP', address=f"10.0.{i // 250}.{i % 250}")]))
+        for i in range(n_nodes)]
+
+    deployments, replicasets, pods, services, ingresses = [], [], [], [], []
+    for d in range(n_deploy):
+        ns = f"ns-{d % n_ns}"
+        app = f"app-{d}"
+        labels = {'app': app, 'tier': 'web' if d % 2 else 'api'}
+        deploy_uid = f"deploy-uid-{d}"
+        deployments.append(client.V1Deployment(
+            metadata=client.V1ObjectMeta(name=app, namespace=ns, uid=deploy_uid),
+            spec=client.V1DeploymentSpec(replicas=pods_per_deploy, selector=client.V1LabelSelector(match_labels=labels),
+                                         template=client.V1PodTemplateSpec()),
+            status=client.V1DeploymentStatus(replicas=pods_per_deploy, ready_replicas=pods_per_deploy)))
+
+        for revision in range(3):
+            rs_name = f"{app}-rs{revision}"
+            active = revision == 2
+            replicasets.append(client.V1ReplicaSet(
+                metadata=client.V1ObjectMeta(name=rs_name, namespace=ns, uid=f"rs-uid-{d}-{revision}",
+                                             owner_references=[client.V1OwnerReference(
+                                                 api_version='apps/v1', kind='Deployment', name=app,
+                                                 uid=deploy_uid, controller=True)]),
+                spec=client.V1ReplicaSetSpec(replicas=pods_per_deploy if active else 0,
+                                             selector=client.V1LabelSelector(match_labels=labels)),
+                status=client.V1ReplicaSetStatus(replicas=pods_per_deploy if active else 0,
+                                                 ready_replicas=pods_per_deploy if active else 0)))
+
+        for p in range(pods_per_deploy):
+            pods.append(client.V1Pod(
+                metadata=client.V1ObjectMeta(name=f"{app}-{p}", namespace=ns, labels=dict(labels),
+                                             owner_references=[client.V1OwnerReference(
+                                                 api_version='apps/v1', kind='ReplicaSet', name=f"{app}-rs2",
+                                                 uid=f"rs-uid-{d}-2", controller=True)]),
+                spec=client.V1PodSpec(containers=[], node_name=f"node-{(d + p) % n_nodes}"),
+                status=client.V1PodStatus(phase='Running', pod_ip=f"10.1.{d % 250}.{p}",
+                                          container_statuses=[])))
+
+        services.append(client.V1Service(
+            metadata=client.V1ObjectMeta(name=app, namespace=ns),
+            spec=client.V1ServiceSpec(type='ClusterIP', cluster_ip=f"10.96.{d // 250}.{d % 250}", selector={'app': app},
+                                      ports=[client.V1ServicePort(port=80, target_port=8080, protocol='TCP')]),
+            status=client.V1ServiceStatus(load_balancer=client.V1LoadBalancerStatus())))
+
+        if d % 10 == 0:
+            backend = client.V1IngressBackend(service=client.V1IngressServiceBackend(
+                name=app, port=client.V1ServiceBackendPort(number=80)))
+            path = client.V1HTTPIngressPath(path='/', path_type='Prefix', backend=backend)
+            rule = client.V1IngressRule(host=f"{app}.example.com",
+                                        http=client.V1HTTPIngressRuleValue(paths=[path]))
+            ingresses.append(client.V1Ingress(
+                metadata=client.V1ObjectMeta(name=f"{app}-ing", namespace=ns),
+                spec=client.V1IngressSpec(rules=[rule])))
+
+    return namespaces, k8s_nodes, pods, replicasets, deployments, services, ingresses
+
+
+def run(total_objects, repeat):
+    objects = make_cluster(total_objects)
+    count = sum(len(group) for group in objects)
+    builder = TopologyBuilder()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = builder.build_graph(*objects)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{count:>8} objects  {len(result['nodes']):>8} nodes  {len(result['edges']):>8} edges  "
+          f"{best * 1000:>9.1f} ms  {best * 1e6 / count:>7.2f} us/object")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[2500, 5000, 10000, 20000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
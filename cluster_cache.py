@@ -0,0 +1,249 @@
+"""
+Shared in-process cache of Kubernetes objects for the dashboard.
+
+Each resource kind is fed by a LIST followed by a WATCH that resumes from the
+last seen resourceVersion, so API endpoints read from memory instead of
+issuing full LIST calls on every browser poll.
+"""
+
+import logging
+import threading
+import time
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+logger = logging.getLogger('k8s_dashboard')
+
+HTTP_STATUS_GONE = 410
+
+
+def object_key(obj):
+    """Return the cache key ("namespace/name" or "name") for an object"""
+    if obj.metadata.namespace:
+        return f"{obj.metadata.namespace}/{obj.metadata.name}"
+    return obj.metadata.name
+
+
+class ResourceInformer:
+    """Keeps an in-memory copy of one resource kind in sync with the API server"""
+
+    def __init__(self, kind, list_func, relist_interval=600, watch_timeout=300):
+        self.kind = kind
+        self.list_func = list_func
+        self.relist_interval = relist_interval
+        self.watch_timeout = watch_timeout
+
+        self._store = {}
+        self._lock = threading.RLock()           # guards the store only; never held while handlers run
+        self._dispatch_lock = threading.RLock()  # serialises handler calls
+        self._seq = 0                            # bumped with every store change
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+        self._handlers = []                      # [handler, seq of the last change it has seen]
+        self._thread = None
+        self._watch = None
+
+        self.resource_version = None
+        self.last_relist = 0
+        self.last_error = None
+
+    def add_event_handler(self, handler):
+        """Register handler(event_type, obj) called for ADDED/MODIFIED/DELETED/SYNC.
+
+        SYNC is sent after every LIST with the full object list as obj. A
+        handler added after the first LIST gets an immediate SYNC replay and
+        then only changes made after that snapshot.
+        """
+        with self._dispatch_lock:
+            with self._lock:
+                synced = self.has_synced()
+                objects = list(self._store.values())
+                seq = self._seq
+            self._handlers.append([handler, seq])
+            if synced:
+                self._call(handler, 'SYNC', objects)
+
+    def has_synced(self):
+        return self._synced.is_set()
+
+    def wait_for_sync(self, timeout=None):
+        return self._synced.wait(timeout)
+
+    def list(self, namespace=None):
+        """Return cached objects, optionally limited to one namespace"""
+        with self._lock:
+            if namespace is None:
+                return list(self._store.values())
+            return [obj for obj in self._store.values() if obj.metadata.namespace == namespace]
+
+    def get(self, name, namespace=None):
+        with self._lock:
+            return self._store.get(f"{namespace}/{name}" if namespace else name)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"informer-{self.kind}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watch:
+            self._watch.stop()
+
+    def _call(self, handler, event_type, obj):
+        try:
+            handler(event_type, obj)
+        except Exception as e:
+            logger.error(f"Informer {self.kind} handler error: {e}")
+
+    def _notify(self, seq, event_type, obj):
+        """Deliver change seq to every handler that has not seen it; runs without the store lock"""
+        with self._dispatch_lock:
+            for entry in list(self._handlers):
+                if seq <= entry[1]:
+                    continue
+                entry[1] = seq
+                self._call(entry[0], event_type, obj)
+
+    def relist(self):
+        """Replace the store with a fresh LIST and remember its resourceVersion"""
+        result = self.list_func()
+        with self._lock:
+            self._store = {object_key(obj): obj for obj in result.items}
+            self.resource_version = result.metadata.resource_version
+            self.last_relist = time.time()
+            self._seq += 1
+            seq = self._seq
+            self._synced.set()
+        self._notify(seq, 'SYNC', list(result.items))
+        self.last_error = None
+        logger.info(f"Informer {self.kind}: listed {len(result.items)} objects at resourceVersion {self.resource_version}")
+
+    def _apply(self, event_type, obj):
+        key = object_key(obj)
+        with self._lock:
+            if event_type == 'DELETED':
+                self._store.pop(key, None)
+            else:
+                self._store[key] = obj
+            self.resource_version = obj.metadata.resource_version
+            self._seq += 1
+            seq = self._seq
+        self._notify(seq, event_type, obj)
+
+    def _watch_once(self):
+        self._watch = watch.Watch()
+        kwargs = {
+            'resource_version': self.resource_version,
+            'timeout_seconds': self.watch_timeout,
+            'allow_watch_bookmarks': True
+        }
+        for event in self._watch.stream(self.list_func, **kwargs):
+            if self._stop.is_set():
+                break
+            event_type = event['type']
+            if event_type == 'BOOKMARK':
+                self.resource_version = event['raw_object']['metadata']['resourceVersion']
+                continue
+            self._apply(event_type, event['object'])
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                if self.resource_version is None or time.time() - self.last_relist > self.relist_interval:
+                    self.relist()
+                self._watch_once()
+                backoff = 1
+            except ApiException as e:
+                if e.status == HTTP_STATUS_GONE:
+                    logger.info(f"Informer {self.kind}: resourceVersion expired, relisting")
+                    self.resource_version = None
+                    continue
+                self.last_error = e
+                logger.error(f"Informer {self.kind} API error: {e.status} {e.reason}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60)
+            except Exception as e:
+                self.last_error = e
+                logger.error(f"Informer {self.kind} error: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60)
+
+
+class ClusterCache:
+    """Informers for every resource kind served by the dashboard API"""
+
+    def __init__(self, v1, apps_v1, batch_v1, networking_v1, autoscaling_v2, relist_interval=600, sync_timeout=10):
+        self.sync_timeout = sync_timeout
+        list_funcs = {
+            'pods': v1.list_pod_for_all_namespaces,
+            'services': v1.list_service_for_all_namespaces,
+            'endpoints': v1.list_endpoints_for_all_namespaces,
+            'nodes': v1.list_node,
+            'namespaces': v1.list_namespace,
+            'deployments': apps_v1.list_deployment_for_all_namespaces,
+            'replicasets': apps_v1.list_replica_set_for_all_namespaces,
+            'daemonsets': apps_v1.list_daemon_set_for_all_namespaces,
+            'statefulsets': apps_v1.list_stateful_set_for_all_namespaces,
+            'jobs': batch_v1.list_job_for_all_namespaces,
+            'ingresses': networking_v1.list_ingress_for_all_namespaces,
+            'hpas': autoscaling_v2.list_horizontal_pod_autoscaler_for_all_namespaces
+        }
+        self.informers = {
+            kind: ResourceInformer(kind, func, relist_interval=relist_interval)
+            for kind, func in list_funcs.items()
+        }
+
+    def start(self):
+        for informer in self.informers.values():
+            informer.start()
+        logger.info(f"Cluster cache started for {', '.join(self.informers)}")
+
+    def stop(self):
+        for informer in self.informers.values():
+            informer.stop()
+
+    def add_event_handler(self, kind, handler):
+        self.informers[kind].add_event_handler(handler)
+
+    def list(self, kind, namespace=None):
+        """Return objects of a kind from memory.
+
+        Until the informer has completed its first LIST, this waits briefly
+        and then falls back to a direct API call, so errors (RBAC, missing API
+        group) still reach the caller.
+        """
+        informer = self.informers[kind]
+        if not informer.has_synced() and informer.last_error is None:
+            informer.wait_for_sync(self.sync_timeout)
+        if not informer.has_synced():
+            items = informer.list_func().items
+            if namespace is not None:
+                items = [obj for obj in items if obj.metadata.namespace == namespace]
+            return items
+        return informer.list(namespace)
+
+    def get(self, kind, name, namespace=None):
+        informer = self.informers[kind]
+        if informer.has_synced():
+            return informer.get(name, namespace)
+        for obj in self.list(kind, namespace):
+            if obj.metadata.name == name:
+                return obj
+        return None
+
+    def status(self):
+        return {
+            kind: {
+                'synced': informer.has_synced(),
+                'objects': len(informer.list()) if informer.has_synced() else 0,
+                'resource_version': informer.resource_version,
+                'last_relist': informer.last_relist,
+                'last_error': str(informer.last_error) if informer.last_error else None
+            }
+            for kind, informer in self.informers.items()
+        }
@@ -0,0 +1,89 @@
+"""
+Compact columnar encoding for Prometheus matrices.
+
+Prometheus returns every sample as [timestamp, "value"]. Here a matrix is
+sent as one shared timestamp axis plus one packed value array per series:
+base64 little-endian Float32 / Float64 (readable with a typed array in the
+browser; missing samples are NaN) or delta-encoded integers at a per-series
+decimal scale (missing samples are null).
+"""
+
+import sys
+import math
+import base64
+from array import array
+
+MEDIA_TYPE = 'application/vnd.k8s-dashboard.columnar+json'
+ENCODINGS = ('f64', 'f32', 'delta')
+SIGNIFICANT_DIGITS = 6   # precision kept by the delta encoding
+
+
+def timestamp_axis(series_list):
+    """Sorted union of sample timestamps across series"""
+    timestamps = set()
+    for series in series_list:
+        timestamps.update(ts for ts, _ in series.get('values', []))
+    return sorted(timestamps)
+
+
+def encode_axis(timestamps):
+    """{'start', 'step', 'count'} for a regular axis, else {'start', 'deltas'}"""
+    if not timestamps:
+        return {'start': None, 'step': None, 'count': 0}
+    deltas = [b - a for a, b in zip(timestamps, timestamps[1:])]
+    if deltas and all(d == deltas[0] for d in deltas):
+        return {'start': timestamps[0], 'step': deltas[0], 'count': len(timestamps)}
+    if not deltas:
+        return {'start': timestamps[0], 'step': 0, 'count': 1}
+    return {'start': timestamps[0], 'deltas': deltas, 'count': len(timestamps)}
+
+
+def _packed(values, typecode):
+    packed = array(typecode, values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode('ascii')
+
+
+def _delta(values):
+    """Scale to integers keeping SIGNIFICANT_DIGITS, then send the first value and successive differences"""
+    finite = [abs(v) for v in values if not math.isnan(v) and not math.isinf(v)]
+    largest = max(finite) if finite else 0
+    digits = int(math.floor(math.log10(largest))) + 1 if largest else 1
+    decimals = max(0, SIGNIFICANT_DIGITS - digits)
+    factor = 10 ** decimals
+    deltas = []
+    previous = 0
+    for value in values:
+        if math.isnan(value) or math.isinf(value):
+            deltas.append(None)
+            continue
+        scaled = int(round(value * factor))
+        deltas.append(scaled - previous)
+        previous = scaled
+    return {'decimals': decimals, 'deltas': deltas}
+
+
+def encode_matrix(series_list, encoding='f64'):
+    """Encode a Prometheus matrix result as {'timestamps', 'series': [{'metric', 'values'}]}"""
+    timestamps = timestamp_axis(series_list)
+    index = {ts: i for i, ts in enumerate(timestamps)}
+    encoded = []
+    for series in series_list:
+        values = [math.nan] * len(timestamps)
+        for ts, value in series.get('values', []):
+            values[index[ts]] = float(value)
+        if encoding == 'delta':
+            packed = _delta(values)
+        else:
+            packed = _packed(values, 'd' if encoding == 'f64' else 'f')
+        encoded.append({'metric': series.get('metric', {}), 'values': packed})
+    return {'timestamps': encode_axis(timestamps), 'series': encoded}
+
+
+def encode_metrics(metrics, encoding='f64'):
+    """Encode every matrix in a get_metrics_range result; other keys are passed through"""
+    response = {'format': 'columnar', 'encoding': encoding}
+    for name, value in metrics.items():
+        response[name] = encode_matrix(value, encoding) if isinstance(value, list) else value
+    return response
@@ -0,0 +1,30 @@
+"""
+Join Service objects to their Endpoints in memory.
+
+One cluster-wide Endpoints list (or the cached copy) is indexed by
+namespace/name, so looking up a service's backends costs a dict access
+instead of one read_namespaced_endpoints call per service.
+"""
+
+
+def index_endpoints(endpoints_list):
+    """Index ready endpoint addresses by "namespace/service-name"
+
+    Each value is a list of {"ip", "target_ref"} dicts in subset order.
+    """
+    index = {}
+    for endpoints in endpoints_list:
+        addresses = []
+        for subset in endpoints.subsets or []:
+            for addr in subset.addresses or []:
+                addresses.append({
+                    "ip": addr.ip,
+                    "target_ref": addr.target_ref.name if addr.target_ref else None
+                })
+        index[f"{endpoints.metadata.namespace}/{endpoints.metadata.name}"] = addresses
+    return index
+
+
+def service_addresses(index, service):
+    """Return the ready endpoint addresses of a service from an index"""
+    return index.get(f"{service.metadata.namespace}/{service.metadata.name}", [])
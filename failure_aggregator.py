@@ -0,0 +1,65 @@
+"""
+Bounded top-K aggregation of failing requests.
+
+Failures are grouped by (namespace, pod, status, endpoint) with a count,
+first/last seen time and a sample line. At most `capacity` groups are kept
+using the space-saving algorithm: when a new group arrives and the table is
+full, the smallest group is evicted and the newcomer inherits its count as
+an error bound. Memory therefore stays fixed however many failures a storm
+produces, and the heaviest groups are always retained.
+"""
+
+import heapq
+import itertools
+
+
+class FailureAggregator:
+    """Space-saving top-K counter for failure groups"""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.total = 0
+        self._entries = {}    # key -> entry dict
+        self._heap = []       # (count when pushed, tie breaker, key); may be stale
+        self._tie = itertools.count()
+
+    def add(self, namespace, pod, status, endpoint, seen, sample=None, count=1):
+        """Count `count` failures of one group last seen at epoch `seen` (None when unknown)"""
+        self.total += count
+        key = (namespace, pod, status, endpoint)
+        entry = self._entries.get(key)
+        if entry is None:
+            inherited = self._evict() if len(self._entries) >= self.capacity else 0
+            entry = self._entries[key] = {
+                'namespace': namespace, 'pod': pod, 'status': status, 'endpoint': endpoint,
+                'count': inherited, 'error': inherited,
+                'first_seen': seen, 'last_seen': seen, 'sample': sample
+            }
+            heapq.heappush(self._heap, (inherited, next(self._tie), key))
+        entry['count'] += count
+        if seen is None:
+            return
+        if entry['first_seen'] is None or seen < entry['first_seen']:
+            entry['first_seen'] = seen
+        if entry['last_seen'] is None or seen >= entry['last_seen']:
+            entry['last_seen'] = seen
+            if sample is not None:
+                entry['sample'] = sample
+
+    def _evict(self):
+        """Drop the smallest group and return its count"""
+        while True:
+            count, _, key = heapq.heappop(self._heap)
+            entry = self._entries[key]
+            if entry['count'] == count:
+                del self._entries[key]
+                return count
+            # Stale heap position: re-queue with the current count
+            heapq.heappush(self._heap, (entry['count'], next(self._tie), key))
+
+    def top(self, k=100):
+        """Return the k largest groups, most frequent first"""
+        return heapq.nlargest(k, self._entries.values(), key=lambda e: (e['count'], e['last_seen'] or 0))
+
+    def __len__(self):
+        return len(self._entries)
@@ -2,24 +2,38 @@ import os
 import time
 import sys
 import logging
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, Response, render_template, jsonify, request, send_file
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
 import datetime
 from kubernetes.client.rest import ApiException
 import traceback
-import subprocess
-import json
+import kubernetes
 from metrics_helper import get_pod_metrics, get_node_metrics, format_cpu, format_memory
+from cluster_cache import ClusterCache
+from owner_index import OwnerIndex, find_owner, build_children_index, is_inactive_replicaset
+from endpoints_index import index_endpoints, service_addresses
+from node_table import build_node_table, first_ready_ip
+from label_index import LabelIndex
+from log_fetcher import LogFetcher
+from log_cursor import LogCursorStore, parse_timestamp
+from failure_aggregator import FailureAggregator
+from log_tailer import LogTailer
+from single_flight import SingleFlight
+from pod_selectors import PodSelector
+import log_stream
+import columnar
 
 # Import Prometheus client
 try:
-    from prometheus_client import PrometheusClient
+    from prometheus_client import PrometheusClient, GROUP_BY as PROMETHEUS_GROUP_BY, PROMETHEUS_REQUEST_METRIC
     PROMETHEUS_AVAILABLE = True
     prom_client = PrometheusClient("http://localhost:9090")
 except Exception as e:
     PROMETHEUS_AVAILABLE = False
     prom_client = None
+    PROMETHEUS_GROUP_BY = {}
+    PROMETHEUS_REQUEST_METRIC = 'http_requests_total'
     print(f"⚠️  Prometheus client not available: {e}")
 
 # Set up logging to file
@@ -64,10 +78,62 @@ except Exception as e:
 # Initialize Kubernetes API clients
 v1 = client.CoreV1Api()
 apps_v1 = client.AppsV1Api()
+batch_v1 = client.BatchV1Api()
 storage_v1 = client.StorageV1Api()
 networking_v1 = client.NetworkingV1Api()
 autoscaling_v1 = client.AutoscalingV1Api()
 autoscaling_v2 = client.AutoscalingV2Api()
+custom_api = client.CustomObjectsApi()
+version_api = client.VersionApi()
+
+# Shared watch-fed cache behind the /api/* endpoints
+cluster_cache = ClusterCache(v1, apps_v1, batch_v1, networking_v1, autoscaling_v2)
+cluster_cache.start()
+
+# Label selector index over cached pods, shared by the topology and graph endpoints
+pod_label_index = LabelIndex()
+cluster_cache.add_event_handler('pods', pod_label_index.handle_event)
+
+# Parallel pod log reads for the request-metrics and failure-details endpoints
+log_fetcher = LogFetcher(v1)
+# Per-container log cursors so request-metrics polls only read new lines
+log_cursor_store = LogCursorStore(log_fetcher)
+# One log-analysis pass per (namespace, pods, time_range), shared by the metrics endpoints
+LOG_ANALYSIS_TTL = float(os.environ.get('LOG_ANALYSIS_TTL', 5))
+log_analysis_cache = SingleFlight(ttl=LOG_ANALYSIS_TTL)
+
+# Opt-in streaming tailer (LOG_TAILER_SELECTOR) that answers from memory for the pods it follows
+log_tailer = LogTailer(v1)
+if log_tailer.enabled:
+    cluster_cache.add_event_handler('pods', log_tailer.handle_event)
+    logger.info(f"Log tailer following pods matching {log_tailer.selector}")
+
+def tailer_coverage(pods):
+    """Coverage object for answers served by the log tailer"""
+    return {'pods_total': len(pods), 'pods_fetched': len(pods), 'pods_failed': 0, 'pods_timed_out': 0,
+            'complete': True, 'ratio': 1.0, 'elapsed_seconds': 0, 'source': 'tailer'}
+
+def pod_selector_index(pods):
+    """Return the shared pod label index, or a one-off index while the pod informer has not synced"""
+    if cluster_cache.informers['pods'].has_synced():
+        return pod_label_index
+    return LabelIndex(pods)
+
+# Server version rarely changes, so it is probed once an hour
+VERSION_CACHE_TTL = 3600
+_version_cache = {'data': None, 'time': 0}
+
+def get_server_version():
+    """Get the API server gitVersion, cached for VERSION_CACHE_TTL seconds"""
+    now = time.time()
+    if _version_cache['data'] and now - _version_cache['time'] < VERSION_CACHE_TTL:
+        return _version_cache['data']
+    try:
+        _version_cache['data'] = version_api.get_code().git_version
+        _version_cache['time'] = now
+    except Exception as e:
+        logger.error(f"Error getting Kubernetes version: {e}")
+    return _version_cache['data'] or "N/A"
 
 def format_age(creation_timestamp):
     """Format age in human readable format (hours, days, months)"""
@@ -109,7 +175,7 @@ def chatbot_api():
             return jsonify({'response': 'Please enter a message.'})
         
         # Initialize AI chatbot
-        chatbot = K8sAIChatbot(v1, apps_v1)
+        chatbot = K8sAIChatbot(v1, apps_v1, cluster_cache)
         response = chatbot.get_ai_response(user_message)
         
         return jsonify({'response': response})
@@ -133,11 +199,6 @@ def topology():
 def monitoring():
     return render_template('monitoring_integrations.html')
 
-def match_labels(selector, labels):
-    if not selector or not labels:
-        return False
-    return all(labels.get(k) == v for k, v in selector.items())
-
 def get_health(resource_type, status):
     if resource_type == 'pod':
         if status.phase == 'Running':
@@ -149,6 +210,9 @@ def get_health(resource_type, status):
         return 'warning' if status.ready_replicas else 'error'
     return 'unknown'
 
+# Hide zero-replica ReplicaSets kept as Deployment revision history unless ?skip_inactive_replicasets= says otherwise
+TOPOLOGY_SKIP_INACTIVE_RS = os.environ.get('TOPOLOGY_SKIP_INACTIVE_RS', 'false')
+
 @app.route('/api/topology')
 def get_topology_data():
     nodes, edges = [], []
@@ -156,15 +220,17 @@ def get_topology_data():
     
     try:
         # Get resources
-        namespaces = v1.list_namespace().items
-        pods = v1.list_pod_for_all_namespaces().items
-        services = v1.list_service_for_all_namespaces().items
-        deployments = apps_v1.list_deployment_for_all_namespaces().items
-        replicasets = apps_v1.list_replica_set_for_all_namespaces().items
+        pods = cluster_cache.list('pods')
+        label_index = pod_selector_index(pods)
+        services = cluster_cache.list('services')
+        deployments = cluster_cache.list('deployments')
+        replicasets = cluster_cache.list('replicasets')
         try:
-            ingresses = networking_v1.list_ingress_for_all_namespaces().items
+            ingresses = cluster_cache.list('ingresses')
         except:
             ingresses = []
+        children = build_children_index(pods, replicasets)
+        skip_inactive_rs = request.args.get('skip_inactive_replicasets', TOPOLOGY_SKIP_INACTIVE_RS).lower() == 'true'
         
         # Maps
         pod_map, rs_map, deploy_map, svc_map = {}, {}, {}, {}
@@ -183,6 +249,8 @@ def get_topology_data():
         
         # ReplicaSets
         for rs in replicasets:
+            if skip_inactive_rs and is_inactive_replicaset(rs):
+                continue
             rs_id = f"rs-{node_id}"
             rs_map[f"{rs.metadata.namespace}/{rs.metadata.name}"] = rs_id
             nodes.append({
@@ -193,13 +261,10 @@ def get_topology_data():
             node_id += 1
             
             # RS → Pods
-            for pod in pods:
-                if pod.metadata.namespace == rs.metadata.namespace and pod.metadata.owner_references:
-                    for owner in pod.metadata.owner_references:
-                        if owner.kind == 'ReplicaSet' and owner.name == rs.metadata.name:
-                            pod_id = pod_map.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
-                            if pod_id:
-                                edges.append({'source': rs_id, 'target': pod_id, 'type': 'manages'})
+            for pod in children.get(rs.metadata.uid, []):
+                pod_id = pod_map.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
+                if pod_id:
+                    edges.append({'source': rs_id, 'target': pod_id, 'type': 'manages'})
         
         # Deployments
         for deploy in deployments:
@@ -214,53 +279,42 @@ def get_topology_data():
             node_id += 1
             
             # Deploy → RS
-            for rs in replicasets:
-                if rs.metadata.namespace == deploy.metadata.namespace and rs.metadata.owner_references:
-                    for owner in rs.metadata.owner_references:
-                        if owner.kind == 'Deployment' and owner.name == deploy.metadata.name:
-                            rs_id = rs_map.get(f"{rs.metadata.namespace}/{rs.metadata.name}")
-                            if rs_id:
-                                edges.append({'source': deploy_id, 'target': rs_id, 'type': 'manages'})
+            for rs in children.get(deploy.metadata.uid, []):
+                rs_id = rs_map.get(f"{rs.metadata.namespace}/{rs.metadata.name}")
+                if rs_id:
+                    edges.append({'source': deploy_id, 'target': rs_id, 'type': 'manages'})
         
         # Services
         for svc in services:
             svc_id = f"svc-{node_id}"
             svc_map[f"{svc.metadata.namespace}/{svc.metadata.name}"] = svc_id
-            nodes.append({
-                'id': svc_id, 'type': 'service', 'label': svc.metadata.name,
-                'namespace': svc.metadata.namespace, 'svc_type': svc.spec.type,
-                'cluster_ip': svc.spec.cluster_ip, 'selector': svc.spec.selector or {},
-                'ports': [{'port': p.port, 'target': p.target_port, 'protocol': p.protocol, 'node_port': getattr(p, 'node_port', None)} for p in (svc.spec.ports or [])]
-            })
             node_id += 1
             
             # Service → Pods (Track pod-to-pod communication)
-            pod_count = 0
             connected_pods = []
-            for pod in pods:
-                if pod.metadata.namespace == svc.metadata.namespace:
-                    if match_labels(svc.spec.selector, pod.metadata.labels):
-                        pod_id = pod_map.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
-                        if pod_id:
-                            pod_count += 1
-                            connected_pods.append(pod.metadata.name)
-                            # Add protocol info to edge
-                            protocols = list(set([p.protocol for p in (svc.spec.ports or [])]))
-                            edges.append({
-                                'source': svc_id, 
-                                'target': pod_id, 
-                                'type': 'routes',
-                                'layer': 'network',
-                                'protocols': protocols,
-                                'communication': 'pod-to-pod'
-                            })
+            protocols = list(set([p.protocol for p in (svc.spec.ports or [])]))
+            for pod in label_index.select(svc.metadata.namespace, svc.spec.selector):
+                pod_id = pod_map.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
+                if pod_id:
+                    connected_pods.append(pod.metadata.name)
+                    # Add protocol info to edge
+                    edges.append({
+                        'source': svc_id, 
+                        'target': pod_id, 
+                        'type': 'routes',
+                        'layer': 'network',
+                        'protocols': protocols,
+                        'communication': 'pod-to-pod'
+                    })
             
-            # Update service node with connected pods
-            for node in nodes:
-                if node['id'] == svc_id:
-                    node['endpoints'] = pod_count
-                    node['connected_pods'] = connected_pods
-                    break
+            # Endpoint count is known before the node is added
+            nodes.append({
+                'id': svc_id, 'type': 'service', 'label': svc.metadata.name,
+                'namespace': svc.metadata.namespace, 'svc_type': svc.spec.type,
+                'cluster_ip': svc.spec.cluster_ip, 'selector': svc.spec.selector or {},
+                'ports': [{'port': p.port, 'target': p.target_port, 'protocol': p.protocol, 'node_port': getattr(p, 'node_port', None)} for p in (svc.spec.ports or [])],
+                'endpoints': len(connected_pods), 'connected_pods': connected_pods
+            })
         
         # Ingress
         for ing in ingresses:
@@ -305,49 +359,26 @@ def get_data():
         # Get version information
         version_info = {
             "kubernetes_version": "N/A",
-            "kubectl_version": "N/A",
+            "client_version": "N/A",
             "cri_version": "N/A"
         }
         
-        try:
-            # Get Kubernetes version
-            version_output = subprocess.check_output(["kubectl", "version", "--output=json"], stderr=subprocess.STDOUT)
-            version_data = json.loads(version_output)
-            
-            if "serverVersion" in version_data:
-                version_info["kubernetes_version"] = version_data["serverVersion"]["gitVersion"]
-            
-            if "clientVersion" in version_data:
-                version_info["kubectl_version"] = version_data["clientVersion"]["gitVersion"]
-            
-            # Get CRI version from a node
-            try:
-                # Use kubectl directly to get the container runtime
-                nodes_output = subprocess.check_output(["kubectl", "get", "nodes", "-o", "wide"], stderr=subprocess.STDOUT)
-                nodes_lines = nodes_output.decode('utf-8').strip().split('\n')
-                
-                if len(nodes_lines) > 1:  # Header + at least one node
-                    # Get the first node's container runtime
-                    node_line = nodes_lines[1]
-                    columns = node_line.split()
-                    if len(columns) >= 10:
-                        # The container runtime is typically the last column
-                        version_info["cri_version"] = columns[-1]
-                        logger.info(f"Found CRI version: {version_info['cri_version']}")
-            except Exception as e:
-                logger.error(f"Error getting CRI version: {e}")
-                version_info["cri_version"] = "N/A"
-        except Exception as e:
-            logger.error(f"Error getting version information: {e}")
+        version_info["kubernetes_version"] = get_server_version()
+        version_info["client_version"] = f"v{kubernetes.__version__}"
+        
+        # Get CRI version from a node
+        node_list = cluster_cache.list('nodes')
+        if node_list and node_list[0].status.node_info:
+            version_info["cri_version"] = node_list[0].status.node_info.container_runtime_version
         
         # Get metrics first
-        pod_metrics = get_pod_metrics()
-        node_metrics = get_node_metrics()
+        pod_metrics = get_pod_metrics(custom_api)
+        node_metrics = get_node_metrics(custom_api, node_list)
         
         # Get nodes
         nodes = []
-        node_list = v1.list_node()
-        for node in node_list.items:
+        node_table = build_node_table(node_list)
+        for node in node_list:
             # Determine node role
             role = "worker"
             for label in node.metadata.labels:
@@ -355,12 +386,9 @@ def get_data():
                     role = "master"
                     break
             
-            # Get node status
-            status = "Unknown"
-            for condition in node.status.conditions:
-                if condition.type == "Ready":
-                    status = "Ready" if condition.status == "True" else "NotReady"
-                    break
+            # Get node status and addresses
+            node_entry = node_table[node.metadata.name]
+            status = node_entry["status"]
             
             # Get node resources
             allocatable = node.status.allocatable
@@ -380,13 +408,6 @@ def get_data():
             else:
                 creation_time = "Unknown"
             
-            # Get node IP
-            node_ip = "Unknown"
-            for address in node.status.addresses:
-                if address.type == "InternalIP":
-                    node_ip = address.address
-                    break
-            
             # Get node metrics
             node_metric = node_metrics.get(node.metadata.name, {})
             cpu_usage = node_metric.get("cpu", "N/A")
@@ -398,7 +419,9 @@ def get_data():
                 "name": node.metadata.name,
                 "role": role,
                 "status": status,
-                "ip": node_ip,
+                "ip": node_entry["internal_ip"] or "Unknown",
+                "external_ip": node_entry["external_ip"] or "N/A",
+                "zone": node_entry["zone"] or "N/A",
                 "cpu_allocatable": cpu_allocatable,
                 "memory_allocatable": memory_allocatable,
                 "cpu_capacity": cpu_capacity,
@@ -412,18 +435,30 @@ def get_data():
         
         # Get namespaces
         namespaces = []
-        namespace_list = v1.list_namespace()
-        for namespace in namespace_list.items:
+        for namespace in cluster_cache.list('namespaces'):
             namespaces.append({
                 "name": namespace.metadata.name,
                 "status": namespace.status.phase,
                 "creation_time": namespace.metadata.creation_timestamp.strftime("%Y-%m-%d %H:%M:%S") if namespace.metadata.creation_timestamp else "Unknown"
             })
         
+        # Resolve pod owners (ReplicaSet -> Deployment, Job -> CronJob) from one snapshot
+        try:
+            jobs = cluster_cache.list('jobs')
+        except Exception as e:
+            logger.error(f"Error listing jobs: {e}")
+            jobs = []
+        owner_index = OwnerIndex(
+            replicasets=cluster_cache.list('replicasets'),
+            deployments=cluster_cache.list('deployments'),
+            statefulsets=cluster_cache.list('statefulsets'),
+            daemonsets=cluster_cache.list('daemonsets'),
+            jobs=jobs
+        )
+        
         # Get pods
         pods = []
-        pod_list = v1.list_pod_for_all_namespaces(watch=False)
-        for pod in pod_list.items:
+        for pod in cluster_cache.list('pods'):
             # Get pod status
             status = pod.status.phase
             
@@ -487,25 +522,15 @@ def get_data():
             
             # Check if the pod's owner is a deployment and if it's paused
             is_paused = False
+            owner_chain = owner_index.resolve_chain(pod)
             if owner_kind == "ReplicaSet":
-                try:
-                    # Try to find the deployment that owns this replicaset
-                    rs = apps_v1.read_namespaced_replica_set(name=owner, namespace=pod.metadata.namespace)
-                    if rs.metadata.owner_references:
-                        for owner_ref in rs.metadata.owner_references:
-                            if owner_ref.kind == "Deployment":
-                                deployment_name = owner_ref.name
-                                try:
-                                    deployment = apps_v1.read_namespaced_deployment(name=deployment_name, namespace=pod.metadata.namespace)
-                                    if deployment.spec.paused:
-                                        is_paused = True
-                                        status = "Paused"  # Override status for paused deployments
-                                    owner = deployment_name
-                                    owner_kind = "Deployment"
-                                except:
-                                    pass
-                except:
-                    pass
+                deployment_entry = find_owner(owner_chain, "Deployment")
+                if deployment_entry and deployment_entry['object'] is not None:
+                    if deployment_entry['object'].spec.paused:
+                        is_paused = True
+                        status = "Paused"  # Override status for paused deployments
+                    owner = deployment_entry['name']
+                    owner_kind = "Deployment"
             
             # Get pod metrics
             pod_metric_key = f"{pod.metadata.namespace}/{pod.metadata.name}"
@@ -529,13 +554,15 @@ def get_data():
                 "owner": owner,
                 "owner_kind": owner_kind,
                 "owner_name": owner,  # For consistency with the frontend
+                "owner_chain": [{"kind": entry['kind'], "name": entry['name']} for entry in owner_chain],
                 "is_paused": is_paused
             })
         
-        # Get services
+        # Get services, joined to their endpoints in memory
         services = []
-        service_list = v1.list_service_for_all_namespaces(watch=False)
-        for service in service_list.items:
+        endpoints_index = index_endpoints(cluster_cache.list('endpoints'))
+        nodeport_ip = first_ready_ip(node_table)
+        for service in cluster_cache.list('services'):
             # Get service type
             service_type = service.spec.type
             
@@ -555,24 +582,8 @@ def get_data():
             cluster_ip = service.spec.cluster_ip or "N/A"
             
             # Get endpoints count
-            endpoint_count = 0
-            endpoint_addresses = []
-            try:
-                endpoints = v1.read_namespaced_endpoints(
-                    name=service.metadata.name,
-                    namespace=service.metadata.namespace
-                )
-                if endpoints.subsets:
-                    for subset in endpoints.subsets:
-                        if subset.addresses:
-                            endpoint_count += len(subset.addresses)
-                            for addr in subset.addresses:
-                                endpoint_addresses.append({
-                                    "ip": addr.ip,
-                                    "target_ref": addr.target_ref.name if addr.target_ref else None
-                                })
-            except:
-                endpoint_count = 0
+            endpoint_addresses = service_addresses(endpoints_index, service)
+            endpoint_count = len(endpoint_addresses)
             
             # Get service external IP
             external_ip = "N/A"
@@ -590,21 +601,9 @@ def get_data():
                 # Get the first NodePort
                 for port in service.spec.ports:
                     if port.node_port:
-                        # Get a list of worker node IPs
-                        node_list = v1.list_node()
-                        worker_ips = []
-                        for node in node_list.items:
-                            if node.status.conditions:
-                                is_ready = any(cond.type == "Ready" and cond.status == "True" for cond in node.status.conditions)
-                                if is_ready:
-                                    for address in node.status.addresses:
-                                        if address.type == "InternalIP":
-                                            worker_ips.append(address.address)
-                                            break
-                        
-                        if worker_ips:
-                            # Use the first worker node IP with the NodePort
-                            external_ip = f"{worker_ips[0]}:{port.node_port}"
+                        if nodeport_ip:
+                            # Use the first Ready node IP with the NodePort
+                            external_ip = f"{nodeport_ip}:{port.node_port}"
                         break
             
             # Get service ports
@@ -640,8 +639,7 @@ def get_data():
         
         # Get deployments
         deployments = []
-        deployment_list = apps_v1.list_deployment_for_all_namespaces(watch=False)
-        for deployment in deployment_list.items:
+        for deployment in cluster_cache.list('deployments'):
             # Get deployment status
             available_replicas = deployment.status.available_replicas or 0
             replicas = deployment.spec.replicas or 0
@@ -678,8 +676,7 @@ def get_data():
         
         # Get daemonsets
         daemonsets = []
-        daemonset_list = apps_v1.list_daemon_set_for_all_namespaces(watch=False)
-        for ds in daemonset_list.items:
+        for ds in cluster_cache.list('daemonsets'):
             # Get daemonset creation time
             creation_timestamp = ds.metadata.creation_timestamp
             
@@ -712,8 +709,7 @@ def get_data():
             
         # Get statefulsets
         statefulsets = []
-        statefulset_list = apps_v1.list_stateful_set_for_all_namespaces(watch=False)
-        for sts in statefulset_list.items:
+        for sts in cluster_cache.list('statefulsets'):
             # Get statefulset creation time
             creation_timestamp = sts.metadata.creation_timestamp
             
@@ -1240,7 +1236,13 @@ from pod_health_monitor import get_pod_health, restart_pod
 
 @app.route('/api/pod-health')
 def api_pod_health():
-    return get_pod_health(v1, logger)
+    # Before the pod informer syncs, list() falls back to a direct LIST that can fail
+    try:
+        pods = cluster_cache.list('pods')
+    except Exception as e:
+        logger.error(f"Error listing pods for pod health: {e}")
+        return jsonify({'error': str(e)}), 500
+    return get_pod_health(v1, logger, pods=pods)
 @app.route("/test-log-button")
 def test_log_button():
     return send_file("test-log-button.html")
@@ -1259,6 +1261,66 @@ def get_pod_logs(namespace, pod_name):
         logger.error(f"Unexpected error getting logs for pod {pod_name}: {str(e)}")
         return jsonify({'success': False, 'error': f"Unexpected error: {str(e)}"}), 500
 
+@app.route('/api/pods/<namespace>/<pod_name>/logs/stream')
+def stream_pod_logs(namespace, pod_name):
+    """Stream a pod log as text or NDJSON, or as Server-Sent Events with follow=true"""
+    try:
+        follow = request.args.get('follow', 'false').lower() == 'true'
+        fmt = 'sse' if follow else request.args.get('format', 'text')
+        if fmt not in log_stream.FORMATS:
+            return jsonify({'success': False, 'error': f"Unknown format: {fmt}"}), 400
+        container = request.args.get('container') or None
+        timestamps = request.args.get('timestamps', 'false').lower() == 'true'
+        # EventSource reconnects carry the id (timestamp) of the last event received
+        last_event_id = request.headers.get('Last-Event-ID')
+        since_text = last_event_id or request.args.get('since_time')
+        try:
+            since_time = parse_timestamp(since_text) if since_text else None
+        except ValueError:
+            return jsonify({'success': False, 'error': f"Invalid since_time: {since_text}"}), 400
+        since_seconds = request.args.get('since_seconds', type=int)
+        if since_time:
+            since_seconds = log_stream.since_seconds_for(since_time)
+        with_timestamps = timestamps or since_time is not None or fmt == 'sse'
+        
+        response = log_stream.open_log(
+            v1, namespace, pod_name,
+            container=container,
+            follow=follow,
+            previous=request.args.get('previous', 'false').lower() == 'true',
+            tail_lines=request.args.get('limit', type=int),
+            since_seconds=since_seconds,
+            limit_bytes=request.args.get('limit_bytes', type=int),
+            timestamps=with_timestamps
+        )
+    except ApiException as e:
+        logger.error(f"Error streaming logs for pod {pod_name} in namespace {namespace}: {e}")
+        return jsonify({'success': False, 'error': f"API Error: {e.reason}"}), 400
+    except Exception as e:
+        logger.error(f"Unexpected error streaming logs for pod {pod_name}: {str(e)}")
+        return jsonify({'success': False, 'error': f"Unexpected error: {str(e)}"}), 500
+    
+    if fmt == 'text' and not with_timestamps:
+        chunks = log_stream.text_chunks(response)
+    else:
+        lines = log_stream.iter_lines(response)
+        if since_time:
+            lines = log_stream.after(lines, since_time, inclusive=not last_event_id)
+        if fmt == 'sse':
+            chunks = log_stream.sse_events(lines, timestamps)
+        elif fmt == 'ndjson':
+            chunks = log_stream.batched(log_stream.ndjson_lines(lines, container, timestamps))
+        else:
+            chunks = log_stream.batched(log_stream.text_lines(lines, timestamps))
+    
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    if fmt != 'sse' and log_stream.accepts_gzip(request.headers.get('Accept-Encoding')):
+        chunks = log_stream.gzipped(chunks)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    mimetypes = {'text': 'text/plain; charset=utf-8', 'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+    return Response(chunks, mimetype=mimetypes[fmt], headers=headers)
+
 @app.route('/api/yaml/<resource_type>/<namespace>/<name>')
 def get_yaml(resource_type, namespace, name):
     try:
@@ -1303,11 +1365,6 @@ def get_events(namespace, name):
 def api_restart_pod(namespace, pod_name):
     return restart_pod(v1, namespace, pod_name, logger)
 
-def match_labels(selector, labels):
-    if not selector or not labels:
-        return False
-    return all(labels.get(k) == v for k, v in selector.items())
-
 @app.route('/api/graph')
 def get_graph():
     nodes = []
@@ -1315,11 +1372,12 @@ def get_graph():
     node_id = 0
     
     try:
-        pods = v1.list_pod_for_all_namespaces().items
-        services = v1.list_service_for_all_namespaces().items
-        deployments = apps_v1.list_deployment_for_all_namespaces().items
+        pods = cluster_cache.list('pods')
+        label_index = pod_selector_index(pods)
+        services = cluster_cache.list('services')
+        deployments = cluster_cache.list('deployments')
         try:
-            ingresses = networking_v1.list_ingress_for_all_namespaces().items
+            ingresses = cluster_cache.list('ingresses')
         except:
             ingresses = []
         
@@ -1356,12 +1414,10 @@ def get_graph():
                 'selector': deploy.spec.selector.match_labels or {}
             })
             
-            for pod in pods:
-                if pod.metadata.namespace == deploy.metadata.namespace:
-                    if match_labels(deploy.spec.selector.match_labels, pod.metadata.labels):
-                        pod_id = pod_nodes.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
-                        if pod_id:
-                            edges.append({'from': deploy_id, 'to': pod_id})
+            for pod in label_index.select(deploy.metadata.namespace, deploy.spec.selector.match_labels):
+                pod_id = pod_nodes.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
+                if pod_id:
+                    edges.append({'from': deploy_id, 'to': pod_id})
         
         # Add Services
         for svc in services:
@@ -1377,12 +1433,10 @@ def get_graph():
                 'ports': [{'port': p.port, 'target': p.target_port} for p in (svc.spec.ports or [])]
             })
             
-            for pod in pods:
-                if pod.metadata.namespace == svc.metadata.namespace:
-                    if match_labels(svc.spec.selector, pod.metadata.labels):
-                        pod_id = pod_nodes.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
-                        if pod_id:
-                            edges.append({'from': svc_id, 'to': pod_id})
+            for pod in label_index.select(svc.metadata.namespace, svc.spec.selector):
+                pod_id = pod_nodes.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
+                if pod_id:
+                    edges.append({'from': svc_id, 'to': pod_id})
         
         # Add Ingresses
         for ing in ingresses:
@@ -1419,6 +1473,14 @@ def get_graph():
         logger.error(f"Error generating graph: {e}")
         return jsonify({'error': str(e), 'nodes': [], 'edges': []}), 500
 
+@app.route('/api/cache/status')
+def cache_status():
+    """Get sync state of the shared cluster cache"""
+    status = cluster_cache.status()
+    status['log_tailer'] = log_tailer.status()
+    status['log_analysis'] = log_analysis_cache.status()
+    return jsonify(status)
+
 @app.route('/api/setup/prometheus', methods=['POST'])
 def setup_prometheus():
     try:
@@ -1431,8 +1493,9 @@ def setup_prometheus():
 def get_pod_communication():
     """Get pod-to-pod communication flows with protocols and endpoints"""
     try:
-        pods = v1.list_pod_for_all_namespaces().items
-        services = v1.list_service_for_all_namespaces().items
+        label_index = pod_selector_index(cluster_cache.list('pods'))
+        services = cluster_cache.list('services')
+        endpoints_index = index_endpoints(cluster_cache.list('endpoints'))
         
         flows = []
         
@@ -1443,25 +1506,15 @@ def get_pod_communication():
             # Find pods matching service selector
             target_pods = []
             connected_pod_names = []
-            for pod in pods:
-                if pod.metadata.namespace == svc.metadata.namespace:
-                    if match_labels(svc.spec.selector, pod.metadata.labels):
-                        target_pods.append(pod)
-                        connected_pod_names.append(pod.metadata.name)
+            for pod in label_index.select(svc.metadata.namespace, svc.spec.selector):
+                target_pods.append(pod)
+                connected_pod_names.append(pod.metadata.name)
             
             if not target_pods:
                 continue
             
             # Get service endpoints
-            try:
-                endpoints = v1.read_namespaced_endpoints(svc.metadata.name, svc.metadata.namespace)
-                endpoint_ips = []
-                if endpoints.subsets:
-                    for subset in endpoints.subsets:
-                        if subset.addresses:
-                            endpoint_ips.extend([addr.ip for addr in subset.addresses])
-            except:
-                endpoint_ips = []
+            endpoint_ips = [addr['ip'] for addr in service_addresses(endpoints_index, svc)]
             
             # Build flow for each port
             for port in (svc.spec.ports or []):
@@ -1498,8 +1551,7 @@ def get_hpa():
         
         # Try v2 API first (newer)
         try:
-            hpa_list = autoscaling_v2.list_horizontal_pod_autoscaler_for_all_namespaces()
-            for hpa in hpa_list.items:
+            for hpa in cluster_cache.list('hpas'):
                 current_replicas = hpa.status.current_replicas or 0
                 desired_replicas = hpa.status.desired_replicas or 0
                 min_replicas = hpa.spec.min_replicas or 1
@@ -1570,77 +1622,17 @@ def get_request_metrics(namespace=None):
     """Get API request metrics from nginx access logs"""
     try:
         namespace = namespace or request.args.get('namespace', 'all')
-        pod_names = request.args.get('pod', None)
         time_range = request.args.get('time_range', '1h')
-        
-        # Parse pod names if provided (can be comma-separated)
-        selected_pod_names = []
-        if pod_names:
-            selected_pod_names = [name.strip() for name in pod_names.split(',') if name.strip()]
-        
-        time_map = {
-            '5s': 5, '10s': 10, '30s': 30, '60s': 60,
-            '5m': 300, '15m': 900, '1h': 3600, '6h': 21600
-        }
-        since_seconds = time_map.get(time_range, 3600)
-        
-        # Get pods based on namespace selection
-        if namespace == 'all':
-            namespaces_list = v1.list_namespace()
-            pods = []
-            for ns in namespaces_list.items:
-                try:
-                    # For testing, get all pods to show the difference
-                    pod_list = v1.list_namespaced_pod(ns.metadata.name)
-                    pods.extend(pod_list.items)
-                except:
-                    pass
-        elif selected_pod_names:
-            # Get specific pods by name
-            pods = []
-            for pod_name in selected_pod_names:
-                try:
-                    pod = v1.read_namespaced_pod(name=pod_name, namespace=namespace)
-                    pods.append(pod)
-                except:
-                    pass
-        else:
-            # For testing, get all pods in the namespace
-            pod_list = v1.list_namespaced_pod(namespace)
-            pods = pod_list.items
-        
-        total_requests = 0
-        success_count = 0
-        error_count = 0
-        
-        # Parse actual logs for real metrics
-        for pod in pods:
-            try:
-                logs = v1.read_namespaced_pod_log(
-                    name=pod.metadata.name,
-                    namespace=pod.metadata.namespace,
-                    since_seconds=since_seconds,
-                    tail_lines=1000
-                )
-                
-                for line in logs.split('\n'):
-                    if 'HTTP' in line and ('GET /' in line or 'POST /' in line or '"GET /' in line or '"POST /' in line):
-                        total_requests += 1
-                        if ' 200 ' in line:
-                            success_count += 1
-                        elif ' 404 ' in line or ' 500 ' in line or ' 503 ' in line:
-                            error_count += 1
-            except:
-                pass
-        
-        success_rate = (success_count / total_requests * 100) if total_requests > 0 else 100
+        analysis = analyze_traffic(namespace, parse_pod_names(request.args.get('pod')), time_range)
         
         return jsonify({
-            'submit': total_requests,
-            'delivered': success_count,
-            'failure': error_count,
-            'success_rate': round(success_rate, 2),
-            'time_range': time_range
+            'submit': analysis['submit'],
+            'delivered': analysis['delivered'],
+            'failure': analysis['failure'],
+            'success_rate': analysis['success_rate'],
+            'time_range': time_range,
+            'latency': analysis['latency'],
+            'coverage': analysis['coverage']
         })
     except Exception as e:
         logger.error(f"Error getting request metrics: {e}")
@@ -1656,7 +1648,8 @@ def prometheus_status():
     return jsonify({
         'available': True,
         'connected': connected,
-        'url': prom_client.base_url
+        'url': prom_client.base_url,
+        'range_cache': prom_client.range_cache.status()
     })
 
 @app.route('/api/prometheus/metrics')
@@ -1671,125 +1664,230 @@ def get_prometheus_metrics():
     namespace = request.args.get('namespace')
     pods = request.args.getlist('pod')
     duration = int(request.args.get('duration', 60))
+    group_by = request.args.get('group_by') or None
+    max_series = request.args.get('max_series', type=int)
+    if group_by and group_by not in PROMETHEUS_GROUP_BY:
+        return jsonify({'error': f"group_by must be one of: {', '.join(PROMETHEUS_GROUP_BY)}"}), 400
+    # Columnar wire format, asked for with ?format=columnar or the Accept header
+    wire_format = request.args.get('format') or ('columnar' if columnar.MEDIA_TYPE in request.headers.get('Accept', '') else 'prometheus')
+    encoding = request.args.get('encoding', 'f64')
+    if wire_format not in ('prometheus', 'columnar') or encoding not in columnar.ENCODINGS:
+        return jsonify({'error': f"format must be prometheus or columnar, encoding one of: {', '.join(columnar.ENCODINGS)}"}), 400
     
     try:
         metrics = prom_client.get_metrics_range(
             namespace=namespace,
             pod_names=pods if pods else None,
-            duration_minutes=duration
+            duration_minutes=duration,
+            group_by=group_by,
+            max_series=max_series
         )
-        return jsonify(metrics)
+        if wire_format == 'columnar':
+            metrics = columnar.encode_metrics(metrics, encoding)
+        response = jsonify(metrics)
+        response.headers['Vary'] = 'Accept'
+        return response
     except Exception as e:
         logger.error(f"Error fetching Prometheus metrics: {e}")
         return jsonify({'error': str(e)}), 500
 
+FAILURE_TOP_K = 100
+FAILURE_GROUP_CAPACITY = 1000
+
+FAILURE_CODES = {
+    400: ('BAD_REQUEST', 'Bad request', 'WARNING'),
+    401: ('UNAUTHORIZED', 'Unauthorized', 'WARNING'),
+    403: ('FORBIDDEN', 'Forbidden', 'WARNING'),
+    404: ('NOT_FOUND', 'Resource not found', 'WARNING'),
+    429: ('TOO_MANY_REQUESTS', 'Too many requests', 'WARNING'),
+    500: ('INTERNAL_ERROR', 'Internal server error', 'CRITICAL'),
+    502: ('BAD_GATEWAY', 'Bad gateway', 'CRITICAL'),
+    503: ('SERVICE_UNAVAILABLE', 'Service unavailable', 'CRITICAL'),
+    504: ('GATEWAY_TIMEOUT', 'Gateway timeout', 'CRITICAL')
+}
+
+def failure_record(entry):
+    """Build one /api/failure-details row from an aggregated failure group"""
+    status_code = entry['status']
+    if status_code in FAILURE_CODES:
+        error_code, description, severity = FAILURE_CODES[status_code]
+    elif status_code >= 500:
+        error_code, description, severity = (f"HTTP_{status_code}", 'Server error', 'CRITICAL')
+    else:
+        error_code, description, severity = (f"HTTP_{status_code}", 'Client error', 'WARNING')
+    # Groups from Prometheus counters have no per-failure timestamp
+    first_seen, last_seen = (datetime.datetime.fromtimestamp(entry[key]) if entry[key] is not None else None
+                             for key in ('first_seen', 'last_seen'))
+    return {
+        'time': last_seen.strftime('%I:%M:%S %p') if last_seen else None,
+        'namespace': entry['namespace'],
+        'pod': entry['pod'],
+        'error_code': error_code,
+        'description': f"{description} - {entry['endpoint']}",
+        'count': entry['count'],
+        'severity': severity,
+        'status': status_code,
+        'endpoint': entry['endpoint'],
+        'first_seen': first_seen.isoformat() if first_seen else None,
+        'last_seen': last_seen.isoformat() if last_seen else None,
+        'sample': entry['sample']
+    }
+
+# Only pods that can produce access logs are analysed: label HTTP workloads k8s-dashboard/http=true,
+# or set LOG_POD_LABEL_SELECTOR="" to read every running pod
+LOG_POD_LABEL_SELECTOR = os.environ.get('LOG_POD_LABEL_SELECTOR', 'k8s-dashboard/http=true')
+LOG_POD_FIELD_SELECTOR = os.environ.get('LOG_POD_FIELD_SELECTOR', 'status.phase=Running')
+log_pod_selector = PodSelector(LOG_POD_LABEL_SELECTOR, LOG_POD_FIELD_SELECTOR)
+# Pods picked by name skip the label selector: only the field (phase) check applies
+named_log_pod_selector = PodSelector('', LOG_POD_FIELD_SELECTOR)
+
+# Where request metrics come from: auto (Prometheus when it has the request counter, else logs), prometheus or logs
+REQUEST_METRICS_SOURCE = os.environ.get('REQUEST_METRICS_SOURCE', 'auto')
+
+TIME_RANGES = {'5s': 5, '10s': 10, '30s': 30, '60s': 60, '5m': 300, '15m': 900, '1h': 3600, '6h': 21600}
+
+def parse_pod_names(pod_names):
+    """Split the comma-separated ?pod= argument"""
+    if not pod_names:
+        return []
+    return [name.strip() for name in pod_names.split(',') if name.strip()]
+
+def select_log_pods(namespace, selected_pod_names):
+    """Pods whose logs feed the request metrics: all pods, the named pods, or one namespace
+
+    Listings are narrowed server-side by LOG_POD_LABEL_SELECTOR and LOG_POD_FIELD_SELECTOR;
+    named pods are read one by one and only checked against LOG_POD_FIELD_SELECTOR.
+    """
+    selectors = {'label_selector': LOG_POD_LABEL_SELECTOR, 'field_selector': LOG_POD_FIELD_SELECTOR}
+    if namespace == 'all':
+        return v1.list_pod_for_all_namespaces(**selectors).items
+    if selected_pod_names:
+        pods = []
+        for pod_name in selected_pod_names:
+            try:
+                pods.append(v1.read_namespaced_pod(name=pod_name, namespace=namespace))
+            except ApiException as e:
+                logger.warning(f"Skipping pod {namespace}/{pod_name} for log analysis: {e.status} {e.reason}")
+        return named_log_pod_selector.filter(pods)
+    return v1.list_namespaced_pod(namespace, **selectors).items
+
+def cached_log_pods(namespace, selected_pod_names):
+    """Same selection as select_log_pods, from the cluster cache pod informer instead of a LIST"""
+    pods = cluster_cache.list('pods', None if namespace == 'all' else namespace)
+    if namespace != 'all' and selected_pod_names:
+        names = set(selected_pod_names)
+        return named_log_pod_selector.filter([pod for pod in pods if pod.metadata.name in names])
+    return log_pod_selector.filter(pods)
+
+def log_pods_excluded(namespace, selected_pod_names, pods):
+    """How many pods of the selection are not analysed, so an empty result can be explained
+
+    Named pods count when missing or not matching LOG_POD_FIELD_SELECTOR; otherwise
+    it is the pods passing the field selector that LOG_POD_LABEL_SELECTOR left out.
+    """
+    if namespace != 'all' and selected_pod_names:
+        return max(0, len(set(selected_pod_names)) - len(pods))
+    candidates = cluster_cache.list('pods', None if namespace == 'all' else namespace)
+    return max(0, len(named_log_pod_selector.filter(candidates)) - len(pods))
+
+def analyze_traffic(namespace, selected_pod_names, time_range):
+    """Counts, latency and failure groups for one (namespace, pods, time_range)
+
+    Computed once per LOG_ANALYSIS_TTL; concurrent callers for the same key share one pass.
+    """
+    pod_key = () if namespace == 'all' else tuple(sorted(set(selected_pod_names)))
+    key = (namespace, pod_key, time_range)
+    return log_analysis_cache.get(key, lambda: _analyze_traffic(namespace, list(pod_key), time_range))
+
+def prometheus_traffic(namespace, selected_pod_names, since_seconds, aggregator):
+    """Counts from the Prometheus request counter, or None to fall back to logs"""
+    if REQUEST_METRICS_SOURCE == 'logs' or not PROMETHEUS_AVAILABLE or not prom_client:
+        return None
+    # get_api_request_metrics returns None when Prometheus is unreachable, and the client backs off
+    # after a connection failure, so polls neither health-check first nor retry every time
+    result = prom_client.get_api_request_metrics(
+        namespace=None if namespace == 'all' else namespace,
+        pod_names=selected_pod_names,
+        since_seconds=since_seconds
+    )
+    if result is None:
+        return None
+    # Counters say how many failures happened in the window, not when
+    for failure_namespace, pod, status, route, count in result['failures']:
+        aggregator.add(failure_namespace, pod, status, route, None, count=count)
+    counts = {'total': result['submit'], 'success': result['delivered'], 'error': result['failure'], 'latency': None}
+    return counts, {'complete': True, 'source': 'prometheus'}
+
+def _analyze_traffic(namespace, selected_pod_names, time_range):
+    since_seconds = TIME_RANGES.get(time_range, 3600)
+    
+    # Group failures by (pod, status, endpoint) in a bounded top-K table
+    aggregator = FailureAggregator(capacity=FAILURE_GROUP_CAPACITY)
+    # Three instant queries when workloads export a request counter; otherwise read logs
+    from_prometheus = prometheus_traffic(namespace, selected_pod_names, since_seconds, aggregator)
+    if from_prometheus:
+        counts, coverage = from_prometheus
+    elif REQUEST_METRICS_SOURCE == 'prometheus':
+        raise RuntimeError(f"No {PROMETHEUS_REQUEST_METRIC} series in Prometheus for this selection")
+    else:
+        # The tailer answers from memory, so its pods come from the informer rather than a LIST
+        tailed_pods = cached_log_pods(namespace, selected_pod_names) if log_tailer.enabled else None
+        if tailed_pods is not None and log_tailer.covers(tailed_pods, since_seconds):
+            counts = log_tailer.request_counts(tailed_pods, since_seconds)
+            counts['latency'] = log_tailer.latency(tailed_pods, since_seconds)
+            log_tailer.failures(tailed_pods, since_seconds, aggregator)
+            coverage = tailer_coverage(tailed_pods)
+            pods = tailed_pods
+        else:
+            # Parse actual logs for real metrics, reading only lines new since the last poll
+            pods = select_log_pods(namespace, selected_pod_names)
+            counts, coverage = log_cursor_store.analyze(pods, since_seconds, aggregator)
+        coverage['pods_excluded'] = log_pods_excluded(namespace, selected_pod_names, pods)
+        coverage['label_selector'] = LOG_POD_LABEL_SELECTOR
+    
+    # Top groups by count, shown most recent first
+    top = aggregator.top(FAILURE_TOP_K)
+    top.sort(key=lambda entry: entry['last_seen'] or 0, reverse=True)
+    
+    total_requests = counts['total']
+    success_rate = (counts['success'] / total_requests * 100) if total_requests > 0 else 100
+    return {
+        'submit': total_requests,
+        'delivered': counts['success'],
+        'failure': counts['error'],
+        'success_rate': round(success_rate, 2),
+        'time_range': time_range,
+        'latency': counts['latency'],
+        'failures': [failure_record(entry) for entry in top],
+        'total_failures': aggregator.total,
+        'coverage': coverage
+    }
+
 @app.route('/api/failure-details')
 def get_failure_details():
     """Get API failure details from actual pod logs"""
     try:
         namespace = request.args.get('namespace', 'all')
         time_range = request.args.get('time_range', '1h')
-        pod_names = request.args.get('pod', None)
-        
-        selected_pod_names = []
-        if pod_names:
-            selected_pod_names = [name.strip() for name in pod_names.split(',') if name.strip()]
-        
-        time_map = {'5s': 5, '10s': 10, '30s': 30, '60s': 60, '5m': 300, '15m': 900, '1h': 3600, '6h': 21600}
-        since_seconds = time_map.get(time_range, 3600)
-        
-        # Get pods
-        if namespace == 'all':
-            namespaces_list = v1.list_namespace()
-            pods = []
-            for ns in namespaces_list.items:
-                try:
-                    pods.extend(v1.list_namespaced_pod(ns.metadata.name).items)
-                except:
-                    pass
-        elif selected_pod_names:
-            pods = []
-            for pod_name in selected_pod_names:
-                try:
-                    pods.append(v1.read_namespaced_pod(name=pod_name, namespace=namespace))
-                except:
-                    pass
-        else:
-            pods = v1.list_namespaced_pod(namespace).items
-        
-        # Parse actual logs for failures
-        failures = []
-        from datetime import datetime
-        
-        error_map = {
-            '404': ('NOT_FOUND', 'Resource not found', 'WARNING'),
-            '500': ('INTERNAL_ERROR', 'Internal server error', 'CRITICAL'),
-            '503': ('SERVICE_UNAVAILABLE', 'Service unavailable', 'CRITICAL')
-        }
+        analysis = analyze_traffic(namespace, parse_pod_names(request.args.get('pod')), time_range)
         
-        for pod in pods:
-            try:
-                logs = v1.read_namespaced_pod_log(
-                    name=pod.metadata.name,
-                    namespace=pod.metadata.namespace,
-                    since_seconds=since_seconds,
-                    tail_lines=2000  # Increased to capture more failures
-                )
-                
-                for line in logs.split('\n'):
-                    if 'HTTP' in line and ('GET /' in line or 'POST /' in line or '"GET /' in line or '"POST /' in line):
-                        status_code = None
-                        if ' 404 ' in line:
-                            status_code = '404'
-                        elif ' 500 ' in line:
-                            status_code = '500'
-                        elif ' 503 ' in line:
-                            status_code = '503'
-                        
-                        if status_code:
-                            endpoint = 'unknown'
-                            try:
-                                parts = line.split('"')
-                                if len(parts) > 1:
-                                    endpoint = parts[1].split(' ')[1] if ' ' in parts[1] else 'unknown'
-                            except:
-                                pass
-                            
-                            try:
-                                time_str = line.split('[')[1].split(']')[0]
-                                failure_time = datetime.strptime(time_str, '%d/%b/%Y:%H:%M:%S %z')
-                                time_display = failure_time.strftime('%I:%M:%S %p')
-                            except:
-                                time_display = datetime.now().strftime('%I:%M:%S %p')
-                            
-                            error_code, description, severity = error_map.get(status_code, ('UNKNOWN', 'Unknown error', 'ERROR'))
-                            
-                            failures.append({
-                                'time': time_display,
-                                'namespace': pod.metadata.namespace,
-                                'pod': pod.metadata.name,
-                                'error_code': error_code,
-                                'description': f"{description} - {endpoint}",
-                                'count': 1,
-                                'severity': severity
-                            })
-            except:
-                pass
-        
-        # Sort by time (most recent first)
-        failures.sort(key=lambda x: x['time'], reverse=True)
-        
-        # Store total count before limiting
-        total_failures = len(failures)
-        
-        # Limit to 100 most recent failures for display
-        failures = failures[:100]
-        
-        return jsonify({'failures': failures, 'total': total_failures})
+        return jsonify({'failures': analysis['failures'], 'total': analysis['total_failures'],
+                        'coverage': analysis['coverage']})
     except Exception as e:
         logger.error(f"Error getting failure details: {e}")
         return jsonify({'failures': [], 'total': 0})
 
+@app.route('/api/traffic-summary')
+def get_traffic_summary():
+    """Request metrics and failure details from one shared log-analysis pass"""
+    try:
+        namespace = request.args.get('namespace', 'all')
+        time_range = request.args.get('time_range', '1h')
+        return jsonify(analyze_traffic(namespace, parse_pod_names(request.args.get('pod')), time_range))
+    except Exception as e:
+        logger.error(f"Error getting traffic summary: {e}")
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     logger.info("Starting Kubernetes Dashboard Server")
     if PROMETHEUS_AVAILABLE and prom_client and prom_client.check_connection():
@@ -0,0 +1,120 @@
+"""
+Inverted label index for resolving equality selectors against pods.
+
+Each (namespace, label key, value) maps to a bitset of pod slots, so a
+selector is resolved by AND-ing its posting lists (smallest first) instead
+of scanning every pod in the namespace. The index can be fed incrementally
+from the cluster cache pod informer or built from a pod list.
+"""
+
+import threading
+
+
+def bit_count(bits):
+    # int.bit_count needs Python 3.10; the dashboard image runs 3.9
+    return bin(bits).count('1')
+
+
+def pod_key(pod):
+    return f"{pod.metadata.namespace}/{pod.metadata.name}"
+
+
+class LabelIndex:
+    """Maps (namespace, label, value) to a bitset of pod slots"""
+
+    def __init__(self, pods=None):
+        self._lock = threading.RLock()
+        self._reset()
+        if pods:
+            self.rebuild(pods)
+
+    def _reset(self):
+        self._slots = {}       # pod key -> slot number
+        self._pods = []        # slot number -> pod (None when free)
+        self._free = []        # reusable slot numbers
+        self._postings = {}    # (namespace, key, value) -> bitset
+
+    def __len__(self):
+        return len(self._slots)
+
+    def rebuild(self, pods):
+        with self._lock:
+            self._reset()
+            for pod in pods:
+                self._add(pod)
+
+    def handle_event(self, event_type, obj):
+        """Cluster cache event handler: SYNC passes the full pod list"""
+        if event_type == 'SYNC':
+            self.rebuild(obj)
+        elif event_type == 'DELETED':
+            self.remove(obj)
+        else:
+            self.upsert(obj)
+
+    def upsert(self, pod):
+        with self._lock:
+            self._remove(pod_key(pod))
+            self._add(pod)
+
+    def remove(self, pod):
+        with self._lock:
+            self._remove(pod_key(pod))
+
+    def _add(self, pod):
+        key = pod_key(pod)
+        slot = self._free.pop() if self._free else len(self._pods)
+        if slot == len(self._pods):
+            self._pods.append(pod)
+        else:
+            self._pods[slot] = pod
+        self._slots[key] = slot
+        bit = 1 << slot
+        namespace = pod.metadata.namespace
+        for label, value in (pod.metadata.labels or {}).items():
+            posting = (namespace, label, value)
+            self._postings[posting] = self._postings.get(posting, 0) | bit
+
+    def _remove(self, key):
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        pod = self._pods[slot]
+        self._pods[slot] = None
+        self._free.append(slot)
+        mask = ~(1 << slot)
+        namespace = pod.metadata.namespace
+        for label, value in (pod.metadata.labels or {}).items():
+            posting = (namespace, label, value)
+            bits = self._postings.get(posting, 0) & mask
+            if bits:
+                self._postings[posting] = bits
+            else:
+                self._postings.pop(posting, None)
+
+    def select(self, namespace, selector):
+        """Return pods in a namespace whose labels match every selector pair.
+
+        An empty selector matches nothing, like match_labels.
+        """
+        if not selector:
+            return []
+        with self._lock:
+            postings = []
+            for label, value in selector.items():
+                bits = self._postings.get((namespace, label, value))
+                if not bits:
+                    return []
+                postings.append(bits)
+            postings.sort(key=bit_count)
+            bits = postings[0]
+            for other in postings[1:]:
+                bits &= other
+                if not bits:
+                    return []
+            pods = []
+            while bits:
+                low = bits & -bits
+                pods.append(self._pods[low.bit_length() - 1])
+                bits ^= low
+            return pods
@@ -0,0 +1,143 @@
+"""
+Mergeable latency histograms for request metrics.
+
+Latencies are counted into fixed, log-spaced buckets shared by every
+histogram (four per doubling; a percentile is reported as its bucket's
+geometric midpoint, within ~9% of the true value). Merging two histograms
+is a sum of bucket counts, so namespace-wide percentiles cost O(buckets)
+rather than O(requests).
+"""
+
+from bisect import bisect_left
+
+MIN_LATENCY = 0.0001   # 100us
+MAX_LATENCY = 300.0    # 5 minutes
+BUCKETS_PER_DOUBLING = 4
+
+
+def _bucket_bounds():
+    bounds = []
+    bound = MIN_LATENCY
+    factor = 2 ** (1 / BUCKETS_PER_DOUBLING)
+    while bound < MAX_LATENCY:
+        bounds.append(bound)
+        bound *= factor
+    bounds.append(MAX_LATENCY)
+    return bounds
+
+
+# Upper bound (seconds) of each bucket; one extra overflow bucket follows
+BUCKET_BOUNDS = _bucket_bounds()
+
+
+def status_class(status):
+    return f"{status // 100}xx"
+
+
+class LatencyHistogram:
+    """Sparse fixed-bucket histogram of latencies in seconds"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = {}   # bucket index -> count
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        index = bisect_left(BUCKET_BOUNDS, seconds)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.max > self.max:
+            self.max = other.max
+        return self
+
+    def percentile(self, q):
+        """Return the midpoint of the bucket holding the q-th percentile (0-100)"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                if index >= len(BUCKET_BOUNDS):
+                    return self.max
+                lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+                return min((lower * BUCKET_BOUNDS[index]) ** 0.5 if lower else BUCKET_BOUNDS[index], self.max)
+        return self.max
+
+    def summary(self):
+        """Return count and p50/p95/p99/mean/max in milliseconds"""
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+        return {
+            'count': self.count,
+            'p50': ms(self.percentile(50)),
+            'p95': ms(self.percentile(95)),
+            'p99': ms(self.percentile(99)),
+            'mean': ms(self.total / self.count) if self.count else None,
+            'max': ms(self.max) if self.count else None
+        }
+
+
+class LatencyWindows:
+    """Histograms per (route, status class) in time buckets for one pod"""
+
+    def __init__(self):
+        self.buckets = {}   # bucket start -> {(route, status class): LatencyHistogram}
+
+    def record(self, bucket, route, status, seconds):
+        histograms = self.buckets.get(bucket)
+        if histograms is None:
+            histograms = self.buckets[bucket] = {}
+        key = (route, status_class(status))
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def expire(self, oldest):
+        for bucket in [b for b in self.buckets if b < oldest]:
+            del self.buckets[bucket]
+
+    def clear(self):
+        self.buckets = {}
+
+    def merge_into(self, merged, first_bucket):
+        """Add histograms from first_bucket onwards into merged {(route, status class): histogram}"""
+        for bucket, histograms in self.buckets.items():
+            if bucket < first_bucket:
+                continue
+            for key, histogram in histograms.items():
+                target = merged.get(key)
+                if target is None:
+                    target = merged[key] = LatencyHistogram()
+                target.merge(histogram)
+        return merged
+
+
+def latency_report(merged, top=20):
+    """Summarise merged histograms: overall percentiles plus the busiest endpoints"""
+    overall = LatencyHistogram()
+    endpoints = []
+    for (route, klass), histogram in merged.items():
+        overall.merge(histogram)
+        entry = {'route': route, 'status_class': klass}
+        entry.update(histogram.summary())
+        endpoints.append(entry)
+    endpoints.sort(key=lambda e: e['count'], reverse=True)
+    report = overall.summary()
+    report['unit'] = 'ms'
+    report['endpoints'] = endpoints[:top]
+    return report
@@ -0,0 +1,204 @@
+"""
+Incremental pod log reading for request metrics.
+
+Every container gets a cursor holding the timestamp of the last log line
+read (logs are requested with timestamps=True). A poll then only fetches
+lines newer than the cursor and adds their counts to per-pod rolling
+buckets, so steady-state cost follows new traffic rather than the size of
+the time window. A pod is re-read in full only when a wider window than
+it has been tracking is requested. One pass yields request counts, latency
+and failure groups together.
+"""
+
+import time
+import logging
+import threading
+import datetime
+from functools import lru_cache
+
+from access_log import parser_for_pod, is_failure, route_template
+from latency_histogram import LatencyWindows, latency_report
+from path_normalizer import RouteBudget
+
+logger = logging.getLogger('k8s_dashboard')
+
+BUCKET_SECONDS = 5
+RETENTION_SECONDS = 21600  # longest time_range offered by the metrics page (6h)
+
+
+@lru_cache(maxsize=4096)
+def _epoch(seconds):
+    # Consecutive lines mostly share the same second, so strptime runs rarely
+    return int(datetime.datetime.strptime(seconds, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+def add_failures(aggregator, namespace, pod_name, failures, samples, first_bucket, bucket_seconds=BUCKET_SECONDS):
+    """Add per-bucket failure groups from first_bucket on to a FailureAggregator
+
+    failures maps bucket start -> {(route, status): count} and samples maps
+    (route, status) -> (epoch, line) of the latest failure; a group is dated
+    by its sample when the sample falls in that bucket, else by the bucket.
+    """
+    for bucket, groups in failures.items():
+        if bucket < first_bucket:
+            continue
+        for (route, status), count in groups.items():
+            sample = samples.get((route, status))
+            seen = bucket
+            if sample and sample[0] // bucket_seconds * bucket_seconds == bucket:
+                seen = sample[0]
+            aggregator.add(namespace, pod_name, status, route, seen,
+                           sample=sample[1] if sample else None, count=count)
+
+
+def parse_timestamp(ts):
+    """Parse an RFC3339 log timestamp into a sortable (epoch seconds, nanoseconds) tuple"""
+    seconds, _, fraction = ts.rstrip('Z').partition('.')
+    return _epoch(seconds), int((fraction + '000000000')[:9]) if fraction else 0
+
+
+class PodLogState:
+    """Cursors and rolling request counts for one pod"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cursors = {}       # container -> (timestamp tuple, lines seen at that timestamp)
+        self.buckets = {}       # bucket start (epoch) -> [total, success, error]
+        self.failures = {}      # bucket start -> {(route, status): count}
+        self.samples = {}       # (route, status) -> (epoch, line) of the latest failure
+        self.latency = LatencyWindows()
+        self.routes = RouteBudget()
+        self.covered_since = None
+        self.last_used = 0
+
+
+class LogCursorStore:
+    """Per-container log cursors feeding per-pod rolling request counts"""
+
+    def __init__(self, fetcher, bucket_seconds=BUCKET_SECONDS, retention=RETENTION_SECONDS, tail_lines=2000):
+        self.fetcher = fetcher
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention
+        self.tail_lines = tail_lines
+        self._lock = threading.Lock()
+        self._pods = {}  # "namespace/name" -> PodLogState
+
+    def _state(self, pod):
+        key = f"{pod.metadata.namespace}/{pod.metadata.name}"
+        with self._lock:
+            state = self._pods.get(key)
+            if state is None:
+                state = self._pods[key] = PodLogState()
+            return state
+
+    def analyze(self, pods, since_seconds, aggregator=None):
+        """Return ({'total', 'success', 'error', 'latency'}, coverage) over the last since_seconds
+
+        Failures in the window are also added to aggregator (a FailureAggregator) when given.
+        """
+        now = time.time()
+        window_start = now - since_seconds
+        results, coverage = self.fetcher.map(lambda pod: self._refresh(pod, window_start, now), pods)
+
+        counts = {'total': 0, 'success': 0, 'error': 0}
+        latencies = {}
+        first_bucket = int(window_start) // self.bucket_seconds * self.bucket_seconds
+        for pod, state in results:
+            with state.lock:
+                for bucket, (total, success, error) in state.buckets.items():
+                    if bucket >= first_bucket:
+                        counts['total'] += total
+                        counts['success'] += success
+                        counts['error'] += error
+                state.latency.merge_into(latencies, first_bucket)
+                if aggregator is not None:
+                    add_failures(aggregator, pod.metadata.namespace, pod.metadata.name, state.failures,
+                                 state.samples, first_bucket, self.bucket_seconds)
+        counts['latency'] = latency_report(latencies)
+        self._prune(now)
+        return counts, coverage
+
+    def _refresh(self, pod, window_start, now):
+        """Bring one pod's counts up to date; runs on the log fetch pool"""
+        state = self._state(pod)
+        with state.lock:
+            state.last_used = now
+            # Re-read everything when asked for an older window than is tracked
+            backfill = state.covered_since is None or window_start < state.covered_since - self.bucket_seconds
+            if backfill:
+                state.cursors = {}
+                state.buckets = {}
+                state.failures = {}
+                state.samples = {}
+                state.latency.clear()
+                state.routes.clear()
+                state.covered_since = window_start
+
+            parser = parser_for_pod(pod)
+            containers = [c.name for c in (pod.spec.containers or [])] if pod.spec else []
+            for container in containers or [None]:
+                cursor = state.cursors.get(container)
+                if cursor:
+                    since_seconds = max(1, int(now - cursor[0][0]) + 1)
+                else:
+                    since_seconds = max(1, int(now - window_start))
+                logs = self.fetcher.read_log(pod, container=container, since_seconds=since_seconds,
+                                             tail_lines=self.tail_lines, timestamps=True)
+                state.cursors[container] = self._consume(state, logs, cursor, parser)
+
+            oldest = int(now - self.retention)
+            for bucket in [b for b in state.buckets if b < oldest]:
+                del state.buckets[bucket]
+            for bucket in [b for b in state.failures if b < oldest]:
+                del state.failures[bucket]
+            for key in [k for k, (seen, _) in state.samples.items() if seen < oldest]:
+                del state.samples[key]
+            state.latency.expire(oldest)
+        return state
+
+    def _consume(self, state, logs, cursor, parser):
+        """Count lines after the cursor into buckets; return the new cursor (None before any line)"""
+        last_ts, skip = cursor or ((0, 0), 0)
+        new_ts, new_count = last_ts, skip
+        for line in logs.split('\n'):
+            ts_text, _, message = line.partition(' ')
+            try:
+                ts = parse_timestamp(ts_text)
+            except ValueError:
+                continue
+            # since_seconds has one-second resolution, so skip lines already counted
+            if ts < last_ts:
+                continue
+            if ts == last_ts and skip:
+                skip -= 1
+                continue
+            if ts > new_ts:
+                new_ts, new_count = ts, 1
+            else:
+                new_count += 1
+
+            record = parser.parse(message)
+            if record:
+                bucket = ts[0] // self.bucket_seconds * self.bucket_seconds
+                counts = state.buckets.setdefault(bucket, [0, 0, 0])
+                counts[0] += 1
+                route = None
+                if is_failure(record):
+                    counts[2] += 1
+                    route = state.routes.admit(route_template(record.path))
+                    groups = state.failures.setdefault(bucket, {})
+                    key = (route, record.status)
+                    groups[key] = groups.get(key, 0) + 1
+                    state.samples[key] = (ts[0], message)
+                else:
+                    counts[1] += 1
+                if record.latency is not None:
+                    route = route or state.routes.admit(route_template(record.path))
+                    state.latency.record(bucket, route, record.status, record.latency)
+        return (new_ts, new_count) if new_count else None
+
+    def _prune(self, now):
+        """Forget pods that have not been asked about within the retention period"""
+        with self._lock:
+            for key in [k for k, state in self._pods.items() if now - state.last_used > self.retention]:
+                del self._pods[key]
@@ -0,0 +1,89 @@
+"""
+Bounded-concurrency pod log fetching.
+
+Log reads for many pods run on a shared thread pool with a per-pod timeout
+and an overall deadline. When the deadline passes, the pods fetched so far
+are returned together with a coverage summary instead of waiting for the rest.
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger('k8s_dashboard')
+
+LOG_FETCH_CONCURRENCY = int(os.environ.get('LOG_FETCH_CONCURRENCY', 16))
+LOG_FETCH_POD_TIMEOUT = float(os.environ.get('LOG_FETCH_POD_TIMEOUT', 10))
+LOG_FETCH_DEADLINE = float(os.environ.get('LOG_FETCH_DEADLINE', 20))
+
+
+class LogFetcher:
+    """Fetch logs of many pods in parallel within a deadline"""
+
+    def __init__(self, v1, max_workers=LOG_FETCH_CONCURRENCY,
+                 pod_timeout=LOG_FETCH_POD_TIMEOUT, deadline=LOG_FETCH_DEADLINE):
+        self.v1 = v1
+        self.pod_timeout = pod_timeout
+        self.deadline = deadline
+        # One pool for all requests, so concurrent API calls stay bounded
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='log-fetch')
+
+    def read_log(self, pod, container=None, since_seconds=None, tail_lines=None, timestamps=False):
+        """Read one pod (or container) log with the per-pod timeout"""
+        kwargs = {'since_seconds': since_seconds, 'tail_lines': tail_lines}
+        if container:
+            kwargs['container'] = container
+        if timestamps:
+            kwargs['timestamps'] = True
+        return self.v1.read_namespaced_pod_log(
+            name=pod.metadata.name,
+            namespace=pod.metadata.namespace,
+            _request_timeout=self.pod_timeout,
+            **kwargs
+        )
+
+    def fetch(self, pods, since_seconds=None, tail_lines=1000, timestamps=False, deadline=None):
+        """Return ([(pod, log text)], coverage) for the pods fetched before the deadline"""
+        return self.map(lambda pod: self.read_log(pod, since_seconds=since_seconds, tail_lines=tail_lines,
+                                                  timestamps=timestamps),
+                        pods, deadline=deadline)
+
+    def map(self, func, pods, deadline=None):
+        """Run func(pod) for every pod on the pool; return ([(pod, result)], coverage)"""
+        start = time.monotonic()
+        deadline = self.deadline if deadline is None else deadline
+        pending = {self._executor.submit(func, pod): pod for pod in pods}
+        results = []
+        failed = 0
+
+        while pending:
+            remaining = deadline - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                pod = pending.pop(future)
+                try:
+                    results.append((pod, future.result()))
+                except Exception as e:
+                    failed += 1
+                    logger.debug(f"Log fetch failed for {pod.metadata.namespace}/{pod.metadata.name}: {e}")
+
+        # Queued reads that never started are dropped; running ones end at pod_timeout
+        for future in pending:
+            future.cancel()
+        total = len(results) + failed + len(pending)
+        if pending:
+            logger.warning(f"Log fetch deadline of {deadline}s reached with {len(pending)} of {total} pods outstanding")
+
+        coverage = {
+            'pods_total': total,
+            'pods_fetched': len(results),
+            'pods_failed': failed,
+            'pods_timed_out': len(pending),
+            'complete': not pending,
+            'ratio': round(len(results) / total, 4) if total else 1.0,
+            'elapsed_seconds': round(time.monotonic() - start, 3)
+        }
+        return results, coverage
@@ -0,0 +1,219 @@
+"""
+Streaming pod log responses.
+
+Logs are read from the Kubernetes API with _preload_content=False and
+passed on chunk by chunk, so server memory stays constant however large
+the log is. Output is raw text, NDJSON (one object per line) or
+Server-Sent Events for follow mode; non-follow responses can be gzipped
+on the fly.
+"""
+
+import os
+import json
+import time
+import zlib
+import logging
+
+from urllib3.exceptions import ReadTimeoutError
+
+from log_cursor import parse_timestamp
+
+logger = logging.getLogger('k8s_dashboard')
+
+LOG_STREAM_CHUNK = 16384
+LOG_STREAM_MAX_LINE = 65536   # longer lines are split so one line cannot grow the buffer
+LOG_STREAM_READ_TIMEOUT = int(os.environ.get('LOG_STREAM_READ_TIMEOUT', 60))
+# Follow streams end after this long without output; EventSource reconnects with Last-Event-ID
+LOG_STREAM_IDLE_TIMEOUT = int(os.environ.get('LOG_STREAM_IDLE_TIMEOUT', 55))
+FORMATS = ('text', 'ndjson', 'sse')
+
+
+def since_seconds_for(since_time):
+    """The client has no sinceTime parameter: convert to since_seconds, rounding up"""
+    return max(1, int(time.time() - since_time[0]) + 1)
+
+
+def open_log(v1, namespace, pod_name, container=None, follow=False, previous=False, tail_lines=None,
+             since_seconds=None, limit_bytes=None, timestamps=False):
+    """Open a pod log as an unread urllib3 response"""
+    params = {'container': container, 'previous': previous, 'tail_lines': tail_lines,
+              'since_seconds': since_seconds, 'limit_bytes': limit_bytes}
+    timeout = LOG_STREAM_IDLE_TIMEOUT if follow else LOG_STREAM_READ_TIMEOUT
+    return v1.read_namespaced_pod_log(
+        name=pod_name,
+        namespace=namespace,
+        follow=follow,
+        timestamps=timestamps,
+        _preload_content=False,
+        _request_timeout=(10, timeout),
+        **{key: value for key, value in params.items() if value}
+    )
+
+
+def release(response, completed):
+    """Return the connection to the pool; an unfinished stream is closed first so it is not reused"""
+    if not completed:
+        response.close()
+    response.release_conn()
+
+
+class Continuation(bytes):
+    """A later piece of an overlong line that was split; it carries no timestamp"""
+
+
+def iter_lines(response):
+    """Yield log lines (bytes, without newline) from a streamed response, then release it
+
+    Lines longer than LOG_STREAM_MAX_LINE are yielded in pieces; every piece
+    after the first is a Continuation.
+    """
+    pending = b''
+    continued = False   # pending is the rest of a line whose start was already yielded
+    completed = False
+    try:
+        for chunk in response.stream(LOG_STREAM_CHUNK):
+            pending += chunk
+            lines = pending.split(b'\n')
+            pending = lines.pop()
+            if lines and continued:
+                lines[0] = Continuation(lines[0])
+                continued = False
+            yield from lines
+            while len(pending) > LOG_STREAM_MAX_LINE:
+                piece = pending[:LOG_STREAM_MAX_LINE]
+                yield Continuation(piece) if continued else piece
+                pending = pending[LOG_STREAM_MAX_LINE:]
+                continued = True
+        if pending:
+            yield Continuation(pending) if continued else pending
+        completed = True
+    finally:
+        release(response, completed)
+
+
+def split_timestamp(line):
+    """Split b"<RFC3339> message" into (timestamp text, message)"""
+    ts, _, message = line.partition(b' ')
+    return ts.decode('ascii', 'replace'), message
+
+
+def after(lines, since_time, inclusive=True):
+    """Drop timestamped lines before since_time (an (epoch, nanos) tuple)"""
+    keep = True
+    for line in lines:
+        if not isinstance(line, Continuation):
+            try:
+                ts = parse_timestamp(split_timestamp(line)[0])
+                keep = not (ts < since_time or (ts == since_time and not inclusive))
+            except ValueError:
+                keep = True
+        if keep:
+            yield line
+
+
+def text_chunks(response):
+    """Pass the log through unchanged"""
+    completed = False
+    try:
+        yield from response.stream(LOG_STREAM_CHUNK)
+        completed = True
+    finally:
+        release(response, completed)
+
+
+def text_lines(lines, timestamps):
+    """One output line per log line; pieces of a split line are written back to back"""
+    started = False
+    for line in lines:
+        if not isinstance(line, Continuation):
+            if started:
+                yield b'\n'
+            started = True
+            if not timestamps:
+                line = split_timestamp(line)[1]
+        yield line
+    if started:
+        yield b'\n'
+
+
+def ndjson_lines(lines, container, timestamps):
+    for line in lines:
+        entry = {'container': container}
+        if isinstance(line, Continuation):
+            entry['continued'] = True
+        elif timestamps:
+            entry['timestamp'], line = split_timestamp(line)
+        entry['line'] = line.decode('utf-8', 'replace')
+        yield json.dumps(entry).encode() + b'\n'
+
+
+def sse_events(lines, timestamps):
+    """Server-Sent Events, one per line, with the line timestamp as event id"""
+    yield b'retry: 1000\n\n'
+    try:
+        for line in lines:
+            if isinstance(line, Continuation):
+                # No timestamp to resume from
+                yield b'data: ' + line.replace(b'\r', b'') + b'\n\n'
+                continue
+            ts, message = split_timestamp(line)
+            try:
+                parse_timestamp(ts)
+            except ValueError:
+                yield b'data: ' + line.replace(b'\r', b'') + b'\n\n'
+                continue
+            data = line if timestamps else message
+            yield b'id: ' + ts.encode() + b'\ndata: ' + data.replace(b'\r', b'') + b'\n\n'
+    except ReadTimeoutError:
+        # Idle: end the response; the browser reconnects and resumes from Last-Event-ID
+        return
+    except Exception as e:
+        logger.warning(f"Log stream ended: {e}")
+        yield b'event: error\ndata: ' + str(e).encode() + b'\n\n'
+
+
+def batched(chunks, size=LOG_STREAM_CHUNK):
+    """Group small pieces into writes of about size bytes"""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def accepts_gzip(accept_encoding):
+    """True when an Accept-Encoding header allows gzip with a non-zero q-value"""
+    qualities = {}
+    for item in (accept_encoding or '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def gzipped(chunks):
+    """Compress a chunk stream as one gzip member, flushing after every chunk"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
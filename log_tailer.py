@@ -0,0 +1,354 @@
+"""
+Streaming access-log tailer for live traffic analytics.
+
+Opt-in (set LOG_TAILER_SELECTOR, e.g. "app=nginx"): pods matching the label
+selector get one follow=True log stream per container, fed by the cluster
+cache pod informer. Lines are parsed as they arrive into per-pod rolling
+buckets of request totals and per-endpoint/status counts plus the latest
+sample of each failure, so request-metrics and failure-details can be
+answered from memory. Streams reconnect after disconnects and resume from the last
+timestamp seen.
+"""
+
+import os
+import time
+import logging
+import threading
+
+from cluster_cache import object_key
+from log_cursor import parse_timestamp, add_failures, BUCKET_SECONDS, RETENTION_SECONDS
+from access_log import parser_for_pod, is_failure, route_template
+from latency_histogram import LatencyWindows, latency_report
+from path_normalizer import RouteBudget
+from log_stream import release
+
+logger = logging.getLogger('k8s_dashboard')
+
+LOG_TAILER_SELECTOR = os.environ.get('LOG_TAILER_SELECTOR', '')
+LOG_TAILER_MAX_STREAMS = int(os.environ.get('LOG_TAILER_MAX_STREAMS', 200))
+
+
+def parse_selector(selector):
+    """Parse "key=value,key2=value2" into a dict"""
+    labels = {}
+    for term in selector.split(','):
+        key, _, value = term.strip().partition('=')
+        if key:
+            labels[key.strip()] = value.strip()
+    return labels
+
+
+class PodTraffic:
+    """Rolling request counters for one pod"""
+
+    def __init__(self, namespace, name, parser):
+        self.namespace = namespace
+        self.name = name
+        self.parser = parser
+        self.lock = threading.Lock()
+        self.totals = {}       # bucket start -> [total, success, error]
+        self.failures = {}     # bucket start -> {(route, status): count}
+        self.latency = LatencyWindows()
+        self.routes = RouteBudget()
+        self.samples = {}      # (endpoint, status) -> (epoch, line) of the latest failure
+        self.tracking_since = time.time() - RETENTION_SECONDS
+        self.catching_up = 0   # containers whose earlier log has not been read yet
+
+    def add(self, epoch, message):
+        record = self.parser.parse(message)
+        if not record:
+            return
+        bucket = epoch // BUCKET_SECONDS * BUCKET_SECONDS
+        failed = is_failure(record)
+        route = self.routes.admit(route_template(record.path))
+        with self.lock:
+            totals = self.totals.get(bucket)
+            if totals is None:
+                totals = self.totals[bucket] = [0, 0, 0]
+                self._expire(epoch)
+            totals[0] += 1
+            if failed:
+                totals[2] += 1
+                groups = self.failures.setdefault(bucket, {})
+                key = (route, record.status)
+                groups[key] = groups.get(key, 0) + 1
+                self.samples[key] = (epoch, message)
+            else:
+                totals[1] += 1
+            if record.latency is not None:
+                self.latency.record(bucket, route, record.status, record.latency)
+
+    def _expire(self, now):
+        # Containers catch up independently, so bucket keys are not in time order
+        oldest = now - RETENTION_SECONDS
+        for bucket in [b for b in self.totals if b < oldest]:
+            del self.totals[bucket]
+            self.failures.pop(bucket, None)
+        self.latency.expire(oldest)
+        for key in [key for key, (seen, _) in self.samples.items() if seen < oldest]:
+            del self.samples[key]
+
+
+class TailStream:
+    """One follow=True log stream for a pod container"""
+
+    def __init__(self, pod, container, traffic):
+        self.namespace = pod.metadata.namespace
+        self.pod_name = pod.metadata.name
+        self.container = container
+        self.traffic = traffic
+        self.cursor = None      # (timestamp tuple, lines seen at that timestamp)
+        self.skip = 0
+        self.caught_up = False
+        self.caught_up_at = None
+        self.response = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+
+class LogTailer:
+    """Keeps log streams open for labelled pods and aggregates their traffic"""
+
+    def __init__(self, v1, selector=LOG_TAILER_SELECTOR, max_streams=LOG_TAILER_MAX_STREAMS):
+        self.v1 = v1
+        self.selector = parse_selector(selector)
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        self._streams = {}   # (pod key, container) -> TailStream
+        self._traffic = {}   # pod key -> PodTraffic
+
+    @property
+    def enabled(self):
+        return bool(self.selector)
+
+    # ---- Pod discovery -------------------------------------------------------
+
+    def handle_event(self, event_type, obj):
+        """Cluster cache pod handler: SYNC passes the full pod list"""
+        if event_type == 'SYNC':
+            keep = set()
+            for pod in obj:
+                if self._wanted(pod):
+                    keep.add(object_key(pod))
+                    self._ensure(pod)
+            with self._lock:
+                stale = [pod_key for pod_key in self._traffic if pod_key not in keep]
+            for pod_key in stale:
+                self._drop(pod_key)
+        elif event_type == 'DELETED' or not self._wanted(obj):
+            self._drop(object_key(obj))
+        else:
+            self._ensure(obj)
+
+    def _wanted(self, pod):
+        labels = pod.metadata.labels or {}
+        if not all(labels.get(k) == v for k, v in self.selector.items()):
+            return False
+        return pod.status is not None and pod.status.phase == 'Running'
+
+    def _ensure(self, pod):
+        pod_key = object_key(pod)
+        with self._lock:
+            containers = [c.name for c in (pod.spec.containers or []) if (pod_key, c.name) not in self._streams]
+            if not containers:
+                return
+            if len(self._streams) + len(containers) > self.max_streams:
+                logger.warning(f"Log tailer stream limit {self.max_streams} reached, not tailing {pod_key}")
+                return
+            traffic = self._traffic.get(pod_key)
+            if traffic is None:
+                traffic = self._traffic[pod_key] = PodTraffic(pod.metadata.namespace, pod.metadata.name,
+                                                              parser_for_pod(pod))
+            for container in containers:
+                stream = TailStream(pod, container, traffic)
+                with traffic.lock:
+                    traffic.catching_up += 1
+                stream.thread = threading.Thread(target=self._run, args=(stream,),
+                                                 name=f"tail-{pod_key}-{container}", daemon=True)
+                self._streams[(pod_key, container)] = stream
+                stream.thread.start()
+
+    def _drop(self, pod_key):
+        with self._lock:
+            self._traffic.pop(pod_key, None)
+            streams = [key for key in self._streams if key[0] == pod_key]
+            for stream_key in streams:
+                self._stop_stream(self._streams.pop(stream_key))
+
+    def _stop_stream(self, stream):
+        stream.stop_event.set()
+        response = stream.response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def stop(self):
+        with self._lock:
+            for stream in self._streams.values():
+                self._stop_stream(stream)
+            self._streams.clear()
+
+    # ---- Streaming -----------------------------------------------------------
+
+    def _run(self, stream):
+        backoff = 1
+        while not stream.stop_event.is_set():
+            try:
+                self._follow(stream)
+                backoff = 1
+            except Exception as e:
+                if not stream.stop_event.is_set():
+                    logger.debug(f"Log tail {stream.namespace}/{stream.pod_name}/{stream.container} error: {e}")
+            finally:
+                stream.response = None
+            stream.stop_event.wait(backoff)
+            backoff = min(backoff * 2, 60)
+
+    def _catch_up(self, stream):
+        """Read the retention window once before following, chunk by chunk
+
+        It is not retried: if it fails before any line was read, the pod is
+        counted from the attempt onwards so its traffic does not stay unserved.
+        """
+        stream.caught_up_at = time.time()
+        completed = False
+        try:
+            response = self.v1.read_namespaced_pod_log(
+                name=stream.pod_name,
+                namespace=stream.namespace,
+                container=stream.container,
+                timestamps=True,
+                since_seconds=RETENTION_SECONDS,
+                _preload_content=False
+            )
+            completed = self._read_lines(stream, response)
+        finally:
+            stream.caught_up = True
+            traffic = stream.traffic
+            with traffic.lock:
+                traffic.catching_up -= 1
+                # Following resumes from the cursor, so only a catch-up that read nothing leaves a gap
+                if not completed and stream.cursor is None:
+                    traffic.tracking_since = max(traffic.tracking_since, stream.caught_up_at)
+
+    def _follow(self, stream):
+        if not stream.caught_up:
+            self._catch_up(stream)
+            if stream.stop_event.is_set():
+                return
+        # The client has no sinceTime parameter: resume with since_seconds from
+        # the cursor and drop the lines of that second that were already counted
+        resume_from = stream.cursor[0][0] if stream.cursor else stream.caught_up_at
+        since_seconds = max(1, int(time.time() - resume_from) + 1)
+        stream.skip = stream.cursor[1] if stream.cursor else 0
+        response = self.v1.read_namespaced_pod_log(
+            name=stream.pod_name,
+            namespace=stream.namespace,
+            container=stream.container,
+            follow=True,
+            timestamps=True,
+            since_seconds=since_seconds,
+            _preload_content=False
+        )
+        self._read_lines(stream, response)
+
+    def _read_lines(self, stream, response):
+        """Ingest a streamed log response; returns False if the stream was stopped first"""
+        stream.response = response
+        pending = b''
+        completed = False
+        try:
+            for chunk in response.stream(16384):
+                if stream.stop_event.is_set():
+                    return False
+                pending += chunk
+                lines = pending.split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    self._ingest(stream, line.decode('utf-8', 'replace'))
+            if pending:
+                self._ingest(stream, pending.decode('utf-8', 'replace'))
+            completed = True
+        finally:
+            release(response, completed)
+        return True
+
+    def _ingest(self, stream, line):
+        ts_text, _, message = line.partition(' ')
+        try:
+            ts = parse_timestamp(ts_text)
+        except ValueError:
+            return
+        if stream.cursor:
+            last_ts, count = stream.cursor
+            if ts < last_ts:
+                return
+            if ts == last_ts:
+                if stream.skip:
+                    stream.skip -= 1
+                    return
+                stream.cursor = (ts, count + 1)
+            else:
+                stream.cursor = (ts, 1)
+        else:
+            stream.cursor = (ts, 1)
+        stream.traffic.add(ts[0], message)
+
+    # ---- Queries -------------------------------------------------------------
+
+    def covers(self, pods, since_seconds):
+        """True when every pod is being tailed and its counters span the window"""
+        window_start = time.time() - since_seconds
+        with self._lock:
+            for pod in pods:
+                traffic = self._traffic.get(object_key(pod))
+                if traffic is None or traffic.catching_up or traffic.tracking_since > window_start + BUCKET_SECONDS:
+                    return False
+        return True
+
+    def _selected(self, pods):
+        with self._lock:
+            return [self._traffic[key] for key in map(object_key, pods) if key in self._traffic]
+
+    def request_counts(self, pods, since_seconds):
+        """Return {'total', 'success', 'error'} over the last since_seconds"""
+        first_bucket = int(time.time() - since_seconds) // BUCKET_SECONDS * BUCKET_SECONDS
+        counts = {'total': 0, 'success': 0, 'error': 0}
+        for traffic in self._selected(pods):
+            with traffic.lock:
+                for bucket, (total, success, error) in traffic.totals.items():
+                    if bucket >= first_bucket:
+                        counts['total'] += total
+                        counts['success'] += success
+                        counts['error'] += error
+        return counts
+
+    def latency(self, pods, since_seconds):
+        """Return latency percentiles over the last since_seconds"""
+        first_bucket = int(time.time() - since_seconds) // BUCKET_SECONDS * BUCKET_SECONDS
+        merged = {}
+        for traffic in self._selected(pods):
+            with traffic.lock:
+                traffic.latency.merge_into(merged, first_bucket)
+        return latency_report(merged)
+
+    def failures(self, pods, since_seconds, aggregator):
+        """Add failures in the window to a FailureAggregator, one entry per bucket and endpoint"""
+        first_bucket = int(time.time() - since_seconds) // BUCKET_SECONDS * BUCKET_SECONDS
+        for traffic in self._selected(pods):
+            with traffic.lock:
+                add_failures(aggregator, traffic.namespace, traffic.name, traffic.failures, traffic.samples,
+                             first_bucket)
+        return aggregator
+
+    def status(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'selector': self.selector,
+                'pods': len(self._traffic),
+                'streams': len(self._streams),
+                'max_streams': self.max_streams
+            }
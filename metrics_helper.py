@@ -1,81 +1,86 @@
-import subprocess
-import json
-import re
 import logging
+from kubernetes import client
+from kubernetes.utils import parse_quantity
 
 # Get logger
 logger = logging.getLogger('k8s_dashboard')
 
-def get_pod_metrics():
-    """Get pod metrics from kubectl top pods"""
+METRICS_GROUP = "metrics.k8s.io"
+METRICS_VERSION = "v1beta1"
+
+
+def _millicores(cores):
+    return f"{int(cores * 1000)}m"
+
+
+def _mebibytes(num_bytes):
+    return f"{int(num_bytes // (1024 * 1024))}Mi"
+
+
+def get_pod_metrics(custom_api=None):
+    """Get pod metrics from the metrics.k8s.io API (same units as kubectl top pods)"""
     try:
-        result = subprocess.run(
-            ["kubectl", "top", "pods", "--all-namespaces"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        custom_api = custom_api or client.CustomObjectsApi()
+        result = custom_api.list_cluster_custom_object(METRICS_GROUP, METRICS_VERSION, "pods")
         
-        lines = result.stdout.strip().split('\n')
-        if len(lines) <= 1:
-            return {}
-        
-        # Skip header line
         pod_metrics = {}
-        for line in lines[1:]:
-            # Use regex to handle potential spacing issues
-            match = re.match(r'(\S+)\s+(\S+)\s+(\S+)\s+(\S+)', line)
-            if match:
-                namespace = match.group(1)
-                name = match.group(2)
-                cpu = match.group(3)
-                memory = match.group(4)
-                
-                key = f"{namespace}/{name}"
-                pod_metrics[key] = {
-                    "cpu": cpu,
-                    "memory": memory
-                }
-                
-                # Debug output to log file instead of console
-                logger.debug(f"Added metrics for pod {key}: CPU={cpu}, Memory={memory}")
+        for item in result.get("items", []):
+            cpu = 0
+            memory = 0
+            for container in item.get("containers", []):
+                usage = container.get("usage", {})
+                cpu += parse_quantity(usage.get("cpu", "0"))
+                memory += parse_quantity(usage.get("memory", "0"))
+            
+            key = f"{item['metadata']['namespace']}/{item['metadata']['name']}"
+            pod_metrics[key] = {
+                "cpu": _millicores(cpu),
+                "memory": _mebibytes(memory)
+            }
+            
+            # Debug output to log file instead of console
+            logger.debug(f"Added metrics for pod {key}: CPU={pod_metrics[key]['cpu']}, Memory={pod_metrics[key]['memory']}")
         
         return pod_metrics
     except Exception as e:
         logger.error(f"Error getting pod metrics: {e}")
         return {}
 
-def get_node_metrics():
-    """Get node metrics from kubectl top nodes"""
+def get_node_metrics(custom_api=None, nodes=None):
+    """Get node metrics from the metrics.k8s.io API (same units as kubectl top nodes)
+    
+    Percentages are relative to node allocatable, so they are only filled in
+    when the node objects are passed in.
+    """
     try:
-        result = subprocess.run(
-            ["kubectl", "top", "nodes"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        custom_api = custom_api or client.CustomObjectsApi()
+        result = custom_api.list_cluster_custom_object(METRICS_GROUP, METRICS_VERSION, "nodes")
         
-        lines = result.stdout.strip().split('\n')
-        if len(lines) <= 1:
-            return {}
+        allocatable = {}
+        for node in nodes or []:
+            allocatable[node.metadata.name] = node.status.allocatable or {}
         
-        # Skip header line
         node_metrics = {}
-        for line in lines[1:]:
-            parts = line.split()
-            if len(parts) >= 5:
-                name = parts[0]
-                cpu = parts[1]
-                cpu_percent = parts[2]
-                memory = parts[3]
-                memory_percent = parts[4]
-                
-                node_metrics[name] = {
-                    "cpu": cpu,
-                    "cpu_percent": cpu_percent,
-                    "memory": memory,
-                    "memory_percent": memory_percent
-                }
+        for item in result.get("items", []):
+            name = item["metadata"]["name"]
+            usage = item.get("usage", {})
+            cpu = parse_quantity(usage.get("cpu", "0"))
+            memory = parse_quantity(usage.get("memory", "0"))
+            
+            cpu_percent = "N/A"
+            memory_percent = "N/A"
+            node_allocatable = allocatable.get(name, {})
+            if node_allocatable.get("cpu"):
+                cpu_percent = f"{int(cpu * 100 / parse_quantity(node_allocatable['cpu']))}%"
+            if node_allocatable.get("memory"):
+                memory_percent = f"{int(memory * 100 / parse_quantity(node_allocatable['memory']))}%"
+            
+            node_metrics[name] = {
+                "cpu": _millicores(cpu),
+                "cpu_percent": cpu_percent,
+                "memory": _mebibytes(memory),
+                "memory_percent": memory_percent
+            }
         
         return node_metrics
     except Exception as e:
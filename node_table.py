@@ -0,0 +1,51 @@
+"""
+Node address table built once per cluster snapshot.
+
+Holds the Ready state, addresses and zone of every node so that the nodes
+table and NodePort address lookups share one pass over the node list.
+"""
+
+ZONE_LABELS = ('topology.kubernetes.io/zone', 'failure-domain.beta.kubernetes.io/zone')
+
+
+def node_address(node, address_type):
+    """Return the first address of a given type (InternalIP, ExternalIP, ...)"""
+    for address in node.status.addresses or []:
+        if address.type == address_type:
+            return address.address
+    return None
+
+
+def build_node_table(nodes):
+    """Return {node name: {"ready", "status", "internal_ip", "external_ip", "zone"}}"""
+    table = {}
+    for node in nodes:
+        status = "Unknown"
+        for condition in node.status.conditions or []:
+            if condition.type == "Ready":
+                status = "Ready" if condition.status == "True" else "NotReady"
+                break
+
+        labels = node.metadata.labels or {}
+        zone = None
+        for label in ZONE_LABELS:
+            if label in labels:
+                zone = labels[label]
+                break
+
+        table[node.metadata.name] = {
+            "ready": status == "Ready",
+            "status": status,
+            "internal_ip": node_address(node, "InternalIP"),
+            "external_ip": node_address(node, "ExternalIP"),
+            "zone": zone
+        }
+    return table
+
+
+def first_ready_ip(table):
+    """Return the InternalIP of the first Ready node, used for NodePort addresses"""
+    for entry in table.values():
+        if entry["ready"] and entry["internal_ip"]:
+            return entry["internal_ip"]
+    return None
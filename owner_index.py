@@ -0,0 +1,82 @@
+"""
+Owner-reference resolution for Kubernetes workloads.
+
+Built once per snapshot from the controller lists, so a pod's owning
+ReplicaSet/Deployment (or Job/CronJob) is found with dictionary lookups
+instead of one API read per pod.
+"""
+
+MAX_OWNER_DEPTH = 5
+
+
+def controller_ref(obj):
+    """Return the controlling owner reference of an object, or its first one"""
+    refs = obj.metadata.owner_references
+    if not refs:
+        return None
+    for ref in refs:
+        if ref.controller:
+            return ref
+    return refs[0]
+
+
+def find_owner(chain, kind):
+    """Return the first entry of a resolved owner chain with the given kind"""
+    for entry in chain:
+        if entry['kind'] == kind:
+            return entry
+    return None
+
+
+def build_children_index(*object_lists):
+    """Return {owner uid: [child objects]} from one pass over the given lists"""
+    children = {}
+    for objects in object_lists:
+        for obj in objects:
+            for ref in obj.metadata.owner_references or []:
+                children.setdefault(ref.uid, []).append(obj)
+    return children
+
+
+def is_inactive_replicaset(rs):
+    """True for a scaled-down ReplicaSet kept only as Deployment revision history"""
+    return not rs.spec.replicas and not rs.status.replicas
+
+
+class OwnerIndex:
+    """Looks up controller objects by UID or by (kind, namespace, name)"""
+
+    def __init__(self, replicasets=(), deployments=(), statefulsets=(), daemonsets=(), jobs=()):
+        self._by_uid = {}
+        self._by_name = {}
+        for kind, objects in (('ReplicaSet', replicasets), ('Deployment', deployments),
+                              ('StatefulSet', statefulsets), ('DaemonSet', daemonsets),
+                              ('Job', jobs)):
+            for obj in objects:
+                if obj.metadata.uid:
+                    self._by_uid[obj.metadata.uid] = obj
+                self._by_name[(kind, obj.metadata.namespace, obj.metadata.name)] = obj
+
+    def lookup(self, ref, namespace):
+        """Return the indexed object an owner reference points to, if any"""
+        obj = self._by_uid.get(ref.uid) if ref.uid else None
+        if obj is None:
+            obj = self._by_name.get((ref.kind, namespace, ref.name))
+        return obj
+
+    def resolve_chain(self, obj):
+        """Return the owner chain of an object, nearest owner first.
+
+        Each entry is a dict with kind, name, uid and the resolved object
+        (None when the owner kind is not indexed, e.g. a CronJob).
+        """
+        chain = []
+        namespace = obj.metadata.namespace
+        ref = controller_ref(obj)
+        while ref is not None and len(chain) < MAX_OWNER_DEPTH:
+            owner = self.lookup(ref, namespace)
+            chain.append({'kind': ref.kind, 'name': ref.name, 'uid': ref.uid, 'object': owner})
+            if owner is None:
+                break
+            ref = controller_ref(owner)
+        return chain
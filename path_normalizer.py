@@ -0,0 +1,90 @@
+"""
+Route templating for log-derived request metrics.
+
+Request paths are turned into route templates before they are used as
+counter keys: user-supplied route patterns are tried first, then numeric
+ids, UUIDs and hex hashes in path segments are replaced with "{id}".
+Results are memoised in an LRU, and RouteBudget caps the number of
+distinct routes kept per pod so the counters stay bounded.
+"""
+
+import os
+import re
+import threading
+from functools import lru_cache
+
+ROUTE_PATTERNS = os.environ.get('ROUTE_PATTERNS', '')
+MAX_ROUTES_PER_POD = int(os.environ.get('MAX_ROUTES_PER_POD', 200))
+OTHER_ROUTE = '{other}'
+
+ID_SEGMENT = re.compile(
+    r'\d+'                                                          # numeric id
+    r'|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'  # UUID
+    r'|[0-9a-fA-F]{16,}'                                            # hex hash / object id
+)
+
+
+def compile_route(pattern):
+    """Compile "/api/users/{user}/orders/*" style patterns; {name} and * match one segment"""
+    parts = []
+    for segment in pattern.strip('/').split('/'):
+        if segment == '*' or (segment.startswith('{') and segment.endswith('}')):
+            parts.append('[^/]+')
+        elif segment == '**':
+            parts.append('.*')
+        else:
+            parts.append(re.escape(segment))
+    return re.compile('/' + '/'.join(parts) + '/?')
+
+
+class PathNormalizer:
+    """Maps request paths to route templates"""
+
+    def __init__(self, patterns=ROUTE_PATTERNS, cache_size=65536):
+        self._routes = []   # (compiled pattern, template)
+        for pattern in patterns.split(','):
+            if pattern.strip():
+                self.add_route(pattern.strip())
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def add_route(self, pattern):
+        """Add a user route pattern; it is reported as the route template itself"""
+        self._routes.append((compile_route(pattern), pattern))
+        if hasattr(self, 'normalize'):
+            self.normalize.cache_clear()
+
+    def _normalize(self, path):
+        path = path.split('?', 1)[0]
+        for regex, template in self._routes:
+            if regex.fullmatch(path):
+                return template
+        segments = path.split('/')
+        for i, segment in enumerate(segments):
+            if segment and ID_SEGMENT.fullmatch(segment):
+                segments[i] = '{id}'
+        return '/'.join(segments)
+
+
+class RouteBudget:
+    """Caps the distinct routes counted for one pod; extra routes become {other}"""
+
+    def __init__(self, max_routes=MAX_ROUTES_PER_POD):
+        self.max_routes = max_routes
+        self._routes = set()
+        self._lock = threading.Lock()
+
+    def admit(self, route):
+        if route in self._routes:
+            return route
+        with self._lock:
+            if len(self._routes) >= self.max_routes:
+                return OTHER_ROUTE
+            self._routes.add(route)
+        return route
+
+    def clear(self):
+        with self._lock:
+            self._routes = set()
+
+
+default_normalizer = PathNormalizer()
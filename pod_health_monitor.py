@@ -1,12 +1,13 @@
 import datetime
 from flask import jsonify
 
-def get_pod_health(v1, logger):
+def get_pod_health(v1, logger, pods=None):
     try:
         pod_health_data = []
-        pods = v1.list_pod_for_all_namespaces(watch=False)
+        if pods is None:
+            pods = v1.list_pod_for_all_namespaces(watch=False).items
         
-        for pod in pods.items:
+        for pod in pods:
             # Basic pod info
             pod_info = {
                 'name': pod.metadata.name,
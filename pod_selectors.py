@@ -0,0 +1,98 @@
+"""
+In-memory matching of Kubernetes label and field selectors.
+
+Used where pods come from the cluster cache instead of a LIST call, so the
+same LOG_POD_LABEL_SELECTOR / LOG_POD_FIELD_SELECTOR strings select the
+same pods. Label selectors support =, ==, !=, in, notin, exists and !key;
+field selectors support =, == and != on dotted paths such as status.phase.
+"""
+
+import re
+
+_TERMS = re.compile(r',(?![^()]*\))')   # commas outside "in (a,b)" lists
+_SET_TERM = re.compile(r'^(\S+)\s+(in|notin)\s+\((.*)\)$')
+
+
+def _split(selector):
+    return [term.strip() for term in _TERMS.split(selector or '') if term.strip()]
+
+
+def _equality(term):
+    for op in ('!=', '==', '='):
+        if op in term:
+            key, _, value = term.partition(op)
+            return key.strip(), '!=' if op == '!=' else '=', value.strip()
+    return None
+
+
+def label_terms(selector):
+    """Parse a label selector into (key, op, values) terms"""
+    terms = []
+    for term in _split(selector):
+        match = _SET_TERM.match(term)
+        if match:
+            values = {v.strip() for v in match.group(3).split(',') if v.strip()}
+            terms.append((match.group(1), match.group(2), values))
+        elif term.startswith('!'):
+            terms.append((term[1:].strip(), '!', None))
+        else:
+            parsed = _equality(term)
+            if parsed:
+                key, op, value = parsed
+                terms.append((key, op, {value}))
+            else:
+                terms.append((term, 'exists', None))
+    return terms
+
+
+def labels_match(labels, terms):
+    labels = labels or {}
+    for key, op, values in terms:
+        value = labels.get(key)
+        if op == 'exists' and key not in labels:
+            return False
+        if op == '!' and key in labels:
+            return False
+        if op in ('=', 'in') and value not in values:
+            return False
+        if op in ('!=', 'notin') and value in values:
+            return False
+    return True
+
+
+def _field(obj, path):
+    for part in path.split('.'):
+        if obj is None:
+            return None
+        # Field paths are camelCase, client model attributes snake_case
+        obj = getattr(obj, re.sub(r'(?<!^)(?=[A-Z])', '_', part).lower(), None)
+    return obj
+
+
+def field_terms(selector):
+    return [parsed for parsed in map(_equality, _split(selector)) if parsed]
+
+
+def fields_match(obj, terms):
+    for path, op, value in terms:
+        actual = _field(obj, path)
+        actual = '' if actual is None else str(actual)
+        if (actual == value) != (op == '='):
+            return False
+    return True
+
+
+class PodSelector:
+    """A parsed label + field selector pair"""
+
+    def __init__(self, label_selector='', field_selector=''):
+        self.label_selector = label_selector
+        self.field_selector = field_selector
+        self._labels = label_terms(label_selector)
+        self._fields = field_terms(field_selector)
+
+    def matches(self, pod):
+        return labels_match(pod.metadata.labels, self._labels) and fields_match(pod, self._fields)
+
+    def filter(self, pods):
+        return [pod for pod in pods if self.matches(pod)]
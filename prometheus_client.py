@@ -3,42 +3,217 @@ Prometheus Integration for Kubernetes Dashboard
 Fetches metrics from Prometheus and provides them to the dashboard
 """
 
+import os
+import re
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from range_query_cache import RangeQueryCache
+import math
+import time
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connections kept open to Prometheus, also the number of queries run at once
+PROMETHEUS_POOL_SIZE = int(os.environ.get('PROMETHEUS_POOL_SIZE', 8))
+# After a connection failure queries return None without a request, backing off 2s, 4s, ... up to this
+PROMETHEUS_BACKOFF_MAX = int(os.environ.get('PROMETHEUS_BACKOFF_MAX', 60))
+
+# Request counter scraped from the workloads, used for request metrics when present
+PROMETHEUS_REQUEST_METRIC = os.environ.get('PROMETHEUS_REQUEST_METRIC', 'http_requests_total')
+PROMETHEUS_ROUTE_LABEL = os.environ.get('PROMETHEUS_ROUTE_LABEL', 'handler')
+
+# Range queries are sized to at most MAX_POINTS samples per series
+MAX_POINTS = 500
+STEPS = (15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 21600, 86400)  # seconds; 15s is the scrape interval
+GROUP_BY = {'pod': 'namespace, pod', 'namespace': 'namespace'}
+OTHER_SERIES = {'__other__': 'true'}
+
+def auto_step(duration_seconds, max_points=MAX_POINTS):
+    """Smallest standard step that keeps a window within max_points samples"""
+    for step in STEPS:
+        if duration_seconds / step <= max_points:
+            return step
+    return math.ceil(duration_seconds / max_points)
+
+def limit_series(series, max_series):
+    """Keep the max_series largest series (by sum over the window) and add the rest up as one "other" series"""
+    if not max_series or len(series) <= max_series:
+        return series
+    def weight(s):
+        total = 0.0
+        for _, value in s.get('values', []):
+            value = float(value)
+            if not math.isnan(value):
+                total += value
+        return total
+    ranked = sorted(series, key=weight, reverse=True)
+    other = {}
+    for s in ranked[max_series:]:
+        for ts, value in s.get('values', []):
+            value = float(value)
+            if not math.isnan(value):
+                other[ts] = other.get(ts, 0.0) + value
+    metric = dict(OTHER_SERIES, series=str(len(ranked) - max_series))
+    return ranked[:max_series] + [{'metric': metric, 'values': [[ts, repr(other[ts])] for ts in sorted(other)]}]
+
+def pod_regex(pod_names):
+    """An exact-match pod=~ alternation, escaped for the regex and then for the PromQL string"""
+    return '|'.join(re.escape(name) for name in pod_names).replace('\\', '\\\\')
+
 class PrometheusClient:
-    def __init__(self, prometheus_url="http://localhost:9090"):
+    def __init__(self, prometheus_url="http://localhost:9090", pool_size=PROMETHEUS_POOL_SIZE):
         self.base_url = prometheus_url.rstrip('/')
         self.api_url = f"{self.base_url}/api/v1"
+        # One pooled session so queries reuse TCP/TLS connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='prometheus')
+        self.range_cache = RangeQueryCache()
+        self._lock = threading.Lock()
+        self._failures = 0       # consecutive connection failures
+        self._retry_at = 0
     
-    def query(self, query):
-        """Execute a PromQL query"""
+    def _reachable(self):
+        return time.time() >= self._retry_at
+    
+    def _connection_failed(self, e):
+        """Back off before the next request; only the first failure of a run is a warning"""
+        with self._lock:
+            if time.time() < self._retry_at:
+                return  # concurrent queries of the same attempt count once
+            self._failures += 1
+            failures = self._failures
+            delay = min(PROMETHEUS_BACKOFF_MAX, 2 ** min(failures, 16))
+            self._retry_at = time.time() + delay
+        if failures == 1:
+            logger.warning(f"Prometheus unreachable, retrying in {delay}s: {e}")
+        else:
+            logger.debug(f"Prometheus still unreachable ({failures} failures), retrying in {delay}s: {e}")
+    
+    def _connection_ok(self):
+        if self._failures:
+            with self._lock:
+                self._failures = 0
+                self._retry_at = 0
+            logger.info("Prometheus reachable again")
+    
+    def _get(self, path, params, timeout):
+        """GET an API path and return the decoded JSON, or None on failure or while backing off"""
+        if not self._reachable():
+            return None
+        try:
+            response = self.session.get(f"{self.api_url}/{path}", params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            self._connection_failed(e)
+            return None
+        self._connection_ok()
         try:
-            response = requests.get(f"{self.api_url}/query", params={'query': query}, timeout=5)
             response.raise_for_status()
             return response.json()
         except Exception as e:
-            logger.error(f"Prometheus query failed: {e}")
+            logger.warning(f"Prometheus {path} failed: {e}")
             return None
     
+    def query(self, query):
+        """Execute a PromQL query"""
+        return self._get('query', {'query': query}, 5)
+    
     def query_range(self, query, start, end, step='15s'):
         """Execute a PromQL range query"""
-        try:
-            params = {
-                'query': query,
-                'start': start,
-                'end': end,
-                'step': step
-            }
-            response = requests.get(f"{self.api_url}/query_range", params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            logger.error(f"Prometheus range query failed: {e}")
+        params = {
+            'query': query,
+            'start': start,
+            'end': end,
+            'step': step
+        }
+        return self._get('query_range', params, 10)
+    
+    def cached_query_range(self, query, start, end, step=15):
+        """Range query through the step-aligned cache; only the uncached tail is fetched"""
+        return self.range_cache.query_range(query, start, end, step,
+                                            lambda s, e: self.query_range(query, s, e, f'{step}s'))
+    
+    def query_range_many(self, queries, start, end, step=15):
+        """Run several cached range queries concurrently; returns {name: result list}"""
+        futures = {name: self.executor.submit(self.cached_query_range, query, start, end, step)
+                   for name, query in queries.items()}
+        results = {}
+        for name, future in futures.items():
+            data = future.result()
+            results[name] = data.get('data', {}).get('result', []) if data and data.get('status') == 'success' else []
+        return results
+    
+    def query_many(self, queries):
+        """Run several instant queries concurrently; returns {name: response or None}"""
+        futures = {name: self.executor.submit(self.query, query) for name, query in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
+    
+    def get_api_request_metrics(self, namespace=None, pod_names=None, since_seconds=3600):
+        """Request counts and failure groups over the last since_seconds from the request counter
+
+        Returns None when no matching series exist, so callers can fall back to log analysis.
+        """
+        matchers = []
+        if namespace:
+            matchers.append(f'namespace="{namespace}"')
+        if pod_names:
+            matchers.append(f'pod=~"{pod_regex(pod_names)}"')
+        
+        def increase(extra=None, by=None):
+            selector = ','.join(matchers + ([extra] if extra else []))
+            series = f'{PROMETHEUS_REQUEST_METRIC}{{{selector}}}'
+            grouping = f' by ({by})' if by else ''
+            # Below two scrape intervals increase() has no samples to work with: scale the 1m rate instead
+            if since_seconds < 60:
+                return f'sum{grouping} (rate({series}[1m])) * {since_seconds}'
+            return f'sum{grouping} (increase({series}[{since_seconds}s]))'
+        
+        results = self.query_many({
+            'submit': increase(),
+            'delivered': increase('status=~"[23].."'),
+            'failure': increase('status=~"[45].."'),
+            'failures': increase('status=~"[45].."', f'namespace, pod, status, {PROMETHEUS_ROUTE_LABEL}')
+        })
+        submit = results['submit']
+        if not submit or submit.get('status') != 'success' or not submit.get('data', {}).get('result'):
             return None
+        
+        failures = []
+        for series in self._vector(results['failures']):
+            metric = series.get('metric', {})
+            value = float(series['value'][1])
+            count = 0 if math.isnan(value) else round(value)
+            if count > 0:
+                try:
+                    status = int(metric.get('status', 0))
+                except ValueError:
+                    continue
+                failures.append((metric.get('namespace', ''), metric.get('pod', ''), status,
+                                 metric.get(PROMETHEUS_ROUTE_LABEL, 'unknown'), count))
+        return {
+            'submit': self._extract_value(submit),
+            'delivered': self._extract_value(results['delivered']),
+            'failure': self._extract_value(results['failure']),
+            'failures': failures
+        }
+    
+    def _vector(self, result):
+        if result and result.get('status') == 'success':
+            return result.get('data', {}).get('result', [])
+        return []
+    
+    def _extract_value(self, result):
+        """Extract a scalar count from a single-series instant vector"""
+        data = self._vector(result)
+        if data:
+            value = float(data[0].get('value', [0, 0])[1])
+            return 0 if math.isnan(value) else round(value)
+        return 0
     
     def get_pod_cpu_usage(self, namespace=None, pod_name=None, duration='5m'):
         """Get CPU usage for pods"""
@@ -80,62 +255,59 @@ class PrometheusClient:
         
         return self.query(query)
     
-    def get_metrics_range(self, namespace=None, pod_names=None, duration_minutes=60):
-        """Get time-series metrics for the dashboard"""
-        end = datetime.now()
-        start = end - timedelta(minutes=duration_minutes)
-        
-        start_ts = int(start.timestamp())
-        end_ts = int(end.timestamp())
+    def get_metrics_range(self, namespace=None, pod_names=None, duration_minutes=60, group_by=None,
+                          max_series=None, max_points=MAX_POINTS):
+        """Get time-series metrics for the dashboard
+
+        The step is picked from the window so each series has at most max_points samples.
+        group_by ('pod' or 'namespace') sums container series in PromQL, and max_series keeps
+        the top consumers plus one "other" series.
+        """
+        duration = duration_minutes * 60
+        step = auto_step(duration, max_points)
+        # Step-aligned bounds so repeated polls evaluate at the same timestamps
+        end_ts = int(time.time()) // step * step
+        start_ts = end_ts - duration // step * step
         
         metrics = {
             'cpu': [],
             'memory': [],
             'network_rx': [],
-            'network_tx': []
+            'network_tx': [],
+            'step': step
         }
         
         # Build query filters
-        filter_str = ''
+        matchers = []
         if namespace:
-            filter_str = f'namespace="{namespace}"'
+            matchers.append(f'namespace="{namespace}"')
         if pod_names:
-            pod_filter = '|'.join(pod_names)
-            if filter_str:
-                filter_str += f',pod=~"{pod_filter}"'
-            else:
-                filter_str = f'pod=~"{pod_filter}"'
-        
-        # CPU query
-        cpu_query = f'rate(container_cpu_usage_seconds_total{{{filter_str},container!=""}}[5m])'
-        cpu_data = self.query_range(cpu_query, start_ts, end_ts)
-        if cpu_data and cpu_data.get('status') == 'success':
-            metrics['cpu'] = cpu_data.get('data', {}).get('result', [])
+            matchers.append(f'pod=~"{pod_regex(pod_names)}"')
+        filter_str = ','.join(matchers)
+        container_filter = ','.join(matchers + ['container!=""'])
         
-        # Memory query
-        mem_query = f'container_memory_working_set_bytes{{{filter_str},container!=""}}'
-        mem_data = self.query_range(mem_query, start_ts, end_ts)
-        if mem_data and mem_data.get('status') == 'success':
-            metrics['memory'] = mem_data.get('data', {}).get('result', [])
-        
-        # Network RX query
-        rx_query = f'rate(container_network_receive_bytes_total{{{filter_str}}}[5m])'
-        rx_data = self.query_range(rx_query, start_ts, end_ts)
-        if rx_data and rx_data.get('status') == 'success':
-            metrics['network_rx'] = rx_data.get('data', {}).get('result', [])
+        # Rates span at least one step so wide steps do not skip samples between points
+        window = f'{max(300, step)}s'
+        queries = {
+            'cpu': f'rate(container_cpu_usage_seconds_total{{{container_filter}}}[{window}])',
+            'memory': f'container_memory_working_set_bytes{{{container_filter}}}',
+            'network_rx': f'rate(container_network_receive_bytes_total{{{filter_str}}}[{window}])',
+            'network_tx': f'rate(container_network_transmit_bytes_total{{{filter_str}}}[{window}])'
+        }
+        if group_by:
+            queries = {name: f'sum by ({GROUP_BY[group_by]}) ({query})' for name, query in queries.items()}
         
-        # Network TX query
-        tx_query = f'rate(container_network_transmit_bytes_total{{{filter_str}}}[5m])'
-        tx_data = self.query_range(tx_query, start_ts, end_ts)
-        if tx_data and tx_data.get('status') == 'success':
-            metrics['network_tx'] = tx_data.get('data', {}).get('result', [])
+        # The four range queries run concurrently over the pooled session
+        results = self.query_range_many(queries, start_ts, end_ts, step)
+        for name, series in results.items():
+            metrics[name] = limit_series(series, max_series)
         
         return metrics
     
     def check_connection(self):
         """Check if Prometheus is accessible"""
         try:
-            response = requests.get(f"{self.base_url}/-/healthy", timeout=3)
+            response = self.session.get(f"{self.base_url}/-/healthy", timeout=3)
             return response.status_code == 200
         except:
             return False
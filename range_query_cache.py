@@ -0,0 +1,166 @@
+"""
+Step-aligned cache for Prometheus range queries.
+
+Results are kept per (normalised PromQL, step) as samples keyed by their
+step-aligned timestamp. A later query for a window that overlaps the
+cached one only fetches the missing tail (plus the most recent samples,
+which Prometheus may still revise) and splices it in, like the Cortex /
+Thanos query-frontend. Entries are evicted least recently used once the
+total number of cached samples passes max_samples.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+RANGE_CACHE_MAX_SAMPLES = int(os.environ.get('RANGE_CACHE_MAX_SAMPLES', 2000000))
+# Samples newer than this are re-fetched: the last scrape may not have landed yet
+RANGE_CACHE_FRESHNESS = int(os.environ.get('RANGE_CACHE_FRESHNESS', 60))
+
+
+def normalize_query(query):
+    return re.sub(r'\s+', ' ', query).strip()
+
+
+class _Entry:
+    __slots__ = ('start', 'end', 'series', 'samples')
+
+    def __init__(self):
+        self.start = None
+        self.end = None
+        self.series = {}    # label tuple -> (metric, {timestamp: value})
+        self.samples = 0
+
+
+class RangeQueryCache:
+    """LRU of step-aligned range query results with incremental tail fetches"""
+
+    def __init__(self, max_samples=RANGE_CACHE_MAX_SAMPLES, freshness=RANGE_CACHE_FRESHNESS):
+        self.max_samples = max_samples
+        self.freshness = freshness
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._samples = 0
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.samples_fetched = 0
+
+    def query_range(self, query, start, end, step, fetch):
+        """Return a Prometheus matrix response for [start, end] at step seconds
+
+        fetch(start, end) runs the actual range query; bounds are aligned to step.
+        """
+        start = start // step * step
+        end = end // step * step
+        key = (normalize_query(query), step)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            cached_start, cached_end = (entry.start, entry.end) if entry else (None, None)
+
+        if cached_start is None or start < cached_start or cached_end < start - step:
+            fetch_start = start
+        else:
+            # Keep what is cached except the newest samples, which may still change
+            fresh_from = (end - self.freshness) // step * step
+            fetch_start = max(start, min(cached_end + step, fresh_from))
+
+        data = fetch(fetch_start, end) if fetch_start <= end else None
+        if fetch_start <= end and (not data or data.get('status') != 'success'):
+            return data
+
+        with self._lock:
+            current = self._entries.get(key)
+            if fetch_start != start and current is not entry:
+                # Evicted or replaced while fetching: the tail alone is not a full answer
+                retry = True
+            else:
+                retry = False
+                if fetch_start == start:
+                    self.misses += 1
+                    if current is not None:
+                        self._samples -= current.samples
+                    entry = self._entries[key] = _Entry()
+                elif fetch_start > end:
+                    self.hits += 1
+                else:
+                    self.partial_hits += 1
+                if data:
+                    self._splice(entry, data.get('data', {}).get('result', []), fetch_start)
+                    entry.end = max(entry.end or end, end)
+                self._trim(entry, start)
+                entry.start = start
+                self._entries.move_to_end(key)
+                result = self._matrix(entry, start, end)
+                self._evict()
+        if retry:
+            data = fetch(start, end)
+            with self._lock:
+                self.misses += 1
+            return data
+        return {'status': 'success', 'data': {'resultType': 'matrix', 'result': result}}
+
+    def _splice(self, entry, result, fetch_start):
+        """Replace samples from fetch_start onwards with freshly fetched ones"""
+        for series_key, (_, values) in entry.series.items():
+            for ts in [ts for ts in values if ts >= fetch_start]:
+                del values[ts]
+                entry.samples -= 1
+                self._samples -= 1
+        for series in result:
+            metric = series.get('metric', {})
+            series_key = tuple(sorted(metric.items()))
+            values = entry.series.setdefault(series_key, (metric, {}))[1]
+            for ts, value in series.get('values', []):
+                if ts not in values:
+                    entry.samples += 1
+                    self._samples += 1
+                values[ts] = value
+                self.samples_fetched += 1
+
+    def _trim(self, entry, start):
+        """Drop samples that slid out of the window"""
+        for series_key in list(entry.series):
+            values = entry.series[series_key][1]
+            for ts in [ts for ts in values if ts < start]:
+                del values[ts]
+                entry.samples -= 1
+                self._samples -= 1
+            if not values:
+                del entry.series[series_key]
+
+    def _matrix(self, entry, start, end):
+        result = []
+        for metric, values in entry.series.values():
+            points = [[ts, values[ts]] for ts in sorted(values) if start <= ts <= end]
+            if points:
+                result.append({'metric': metric, 'values': points})
+        return result
+
+    def _evict(self):
+        # The entry just used is last, so it survives unless it alone exceeds the bound
+        while self._samples > self.max_samples and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._samples -= entry.samples
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._samples = 0
+
+    def status(self):
+        with self._lock:
+            lookups = self.hits + self.partial_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'samples': self._samples,
+                'max_samples': self.max_samples,
+                'hits': self.hits,
+                'partial_hits': self.partial_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.partial_hits) / lookups, 3) if lookups else None,
+                'samples_fetched': self.samples_fetched
+            }
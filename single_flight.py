@@ -0,0 +1,72 @@
+"""
+Request coalescing with a short-lived result cache.
+
+Concurrent callers asking for the same key share one computation
+(single-flight); the result is then served to later callers until its TTL
+expires. Errors are passed to the callers that waited but not cached.
+"""
+
+import time
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Compute each key once per TTL, sharing in-flight work between callers"""
+
+    def __init__(self, ttl=5):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._results = {}    # key -> (expires at, value)
+        self._inflight = {}   # key -> _Call
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def get(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._results.get(key)
+            if cached and cached[0] > now:
+                self.hits += 1
+                return cached[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+            with self._lock:
+                expires = time.monotonic() + self.ttl
+                for stale in [k for k, (at, _) in self._results.items() if at <= now]:
+                    del self._results[stale]
+                self._results[key] = (expires, call.value)
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def status(self):
+        with self._lock:
+            return {'ttl': self.ttl, 'entries': len(self._results), 'in_flight': len(self._inflight),
+                    'hits': self.hits, 'misses': self.misses, 'shared': self.shared}
@@ -1,10 +1,15 @@
 from fastapi import FastAPI, WebSocket
-from kubernetes import client, config, watch
+from kubernetes import client, config
 import asyncio
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 import time
+import os
+from label_index import LabelIndex
+from owner_index import build_children_index, is_inactive_replicaset
+from cluster_cache import ResourceInformer
+from topology_engine import TopologyEngine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,17 +19,26 @@ app = FastAPI()
 try:
     config.load_incluster_config()
 except:
-    config.load_kube_config()
+    try:
+        config.load_kube_config()
+    except Exception as e:
+        logger.error(f"Could not load Kubernetes config: {e}")
 
 v1 = client.CoreV1Api()
 apps_v1 = client.AppsV1Api()
 net_v1 = client.NetworkingV1Api()
 
+# Hide zero-replica ReplicaSets kept as Deployment revision history (overridable per /api/topology request)
+TOPOLOGY_SKIP_INACTIVE_RS = os.environ.get('TOPOLOGY_SKIP_INACTIVE_RS', 'false').lower() == 'true'
+
 class TopologyBuilder:
-    def __init__(self):
-        self._cache = None
-        self._cache_time = 0
+    def __init__(self, skip_inactive_replicasets=False, pod_index=LabelIndex):
+        self._cache = {}  # skip_inactive_replicasets -> (build time, topology)
         self._cache_ttl = 30  # Cache for 30 seconds for production
+        # Drop zero-replica ReplicaSets kept as Deployment revision history
+        self.skip_inactive_replicasets = skip_inactive_replicasets
+        # pods -> LabelIndex; the service passes one that returns the shared informer-fed index
+        self.pod_index = pod_index
     def match_labels(self, selector: dict, labels: dict) -> bool:
         if not selector or not labels:
             return False
@@ -102,16 +116,17 @@ class TopologyBuilder:
             return 'warning'
         return 'unknown'
     
-    def build_topology(self) -> Dict:
+    def build_topology(self, skip_inactive_replicasets=None) -> Dict:
+        if skip_inactive_replicasets is None:
+            skip_inactive_replicasets = self.skip_inactive_replicasets
         # Return cached data if still valid
         current_time = time.time()
-        if self._cache and (current_time - self._cache_time) < self._cache_ttl:
+        cached = self._cache.get(skip_inactive_replicasets)
+        if cached and (current_time - cached[0]) < self._cache_ttl:
             logger.info("Returning cached topology data")
-            return self._cache
+            return cached[1]
         
         logger.info("Building fresh topology data")
-        nodes, edges = [], []
-        node_id = 0
         
         # Get resources
         try:
@@ -134,8 +149,27 @@ class TopologyBuilder:
             logger.error(f"Error fetching topology data: {e}")
             return {'nodes': [], 'edges': []}
         
+        result = self.build_graph(namespaces, k8s_nodes, pods, replicasets, deployments, services, ingresses,
+                                  skip_inactive_replicasets)
+        
+        # Cache the result
+        self._cache[skip_inactive_replicasets] = (time.time(), result)
+        logger.info(f"Topology built: {len(result['nodes'])} nodes, {len(result['edges'])} edges")
+        
+        return result
+    
+    def build_graph(self, namespaces, k8s_nodes, pods, replicasets, deployments, services, ingresses,
+                    skip_inactive_replicasets=None) -> Dict:
+        """Build topology nodes and edges from already-fetched objects"""
+        if skip_inactive_replicasets is None:
+            skip_inactive_replicasets = self.skip_inactive_replicasets
+        nodes, edges = [], []
+        node_id = 0
+        
         # Maps
         pod_map, rs_map, deploy_map, svc_map, node_map, ns_map = {}, {}, {}, {}, {}, {}
+        label_index = self.pod_index(pods)
+        children = build_children_index(pods, replicasets)
         
         # Layer 1: Namespaces (Logical Isolation)
         for ns in namespaces:
@@ -191,6 +225,8 @@ class TopologyBuilder:
         
         # Layer 4: Workload Management - ReplicaSets
         for rs in replicasets:
+            if skip_inactive_replicasets and is_inactive_replicaset(rs):
+                continue
             rs_id = f"rs-{node_id}"
             rs_map[f"{rs.metadata.namespace}/{rs.metadata.name}"] = rs_id
             nodes.append({
@@ -202,13 +238,10 @@ class TopologyBuilder:
             node_id += 1
             
             # RS → Pods
-            for pod in pods:
-                if pod.metadata.namespace == rs.metadata.namespace and pod.metadata.owner_references:
-                    for owner in pod.metadata.owner_references:
-                        if owner.kind == 'ReplicaSet' and owner.name == rs.metadata.name:
-                            pod_id = pod_map.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
-                            if pod_id:
-                                edges.append({'source': rs_id, 'target': pod_id, 'type': 'manages', 'layer': 'workload'})
+            for pod in children.get(rs.metadata.uid, []):
+                pod_id = pod_map.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
+                if pod_id:
+                    edges.append({'source': rs_id, 'target': pod_id, 'type': 'manages', 'layer': 'workload'})
         
         # Layer 5: Workload Management - Deployments
         for deploy in deployments:
@@ -223,57 +256,45 @@ class TopologyBuilder:
             node_id += 1
             
             # Deploy → RS
-            for rs in replicasets:
-                if rs.metadata.namespace == deploy.metadata.namespace and rs.metadata.owner_references:
-                    for owner in rs.metadata.owner_references:
-                        if owner.kind == 'Deployment' and owner.name == deploy.metadata.name:
-                            rs_id = rs_map.get(f"{rs.metadata.namespace}/{rs.metadata.name}")
-                            if rs_id:
-                                edges.append({'source': deploy_id, 'target': rs_id, 'type': 'manages', 'layer': 'workload'})
+            for rs in children.get(deploy.metadata.uid, []):
+                rs_id = rs_map.get(f"{rs.metadata.namespace}/{rs.metadata.name}")
+                if rs_id:
+                    edges.append({'source': deploy_id, 'target': rs_id, 'type': 'manages', 'layer': 'workload'})
         
         # Layer 6: Network - Services (Internal Load Balancing)
         for svc in services:
             svc_id = f"svc-{node_id}"
             svc_map[f"{svc.metadata.namespace}/{svc.metadata.name}"] = svc_id
             svc_info = self.get_service_type_info(svc)
+            node_id += 1
+            
+            # Service → Pods (Traffic routing)
+            connected_pods = []
+            protocols = list(set([p.protocol for p in (svc.spec.ports or [])]))
+            for pod in label_index.select(svc.metadata.namespace, svc.spec.selector):
+                pod_id = pod_map.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
+                if pod_id:
+                    connected_pods.append(pod.metadata.name)
+                    # Add protocol info to edge
+                    edges.append({
+                        'source': svc_id, 
+                        'target': pod_id, 
+                        'type': 'routes', 
+                        'layer': 'network',
+                        'protocols': protocols,
+                        'communication': 'pod-to-pod'
+                    })
             
+            # Endpoint count is known before the node is added
             nodes.append({
                 'id': svc_id, 'type': 'service', 'label': svc.metadata.name,
                 'namespace': svc.metadata.namespace, 'svc_type': svc.spec.type,
                 'cluster_ip': svc.spec.cluster_ip, 'selector': svc.spec.selector or {},
                 'ports': [{'port': p.port, 'target': p.target_port, 'protocol': p.protocol, 'node_port': getattr(p, 'node_port', None)} for p in (svc.spec.ports or [])],
                 'external_access': svc_info['external_access'], 'external_ip': svc_info['external_ip'],
+                'endpoints': len(connected_pods), 'connected_pods': connected_pods,
                 'layer': 'network'
             })
-            node_id += 1
-            
-            # Service → Pods (Traffic routing)
-            pod_count = 0
-            connected_pods = []
-            for pod in pods:
-                if pod.metadata.namespace == svc.metadata.namespace:
-                    if self.match_labels(svc.spec.selector, pod.metadata.labels):
-                        pod_id = pod_map.get(f"{pod.metadata.namespace}/{pod.metadata.name}")
-                        if pod_id:
-                            pod_count += 1
-                            connected_pods.append(pod.metadata.name)
-                            # Add protocol info to edge
-                            protocols = list(set([p.protocol for p in (svc.spec.ports or [])]))
-                            edges.append({
-                                'source': svc_id, 
-                                'target': pod_id, 
-                                'type': 'routes', 
-                                'layer': 'network',
-                                'protocols': protocols,
-                                'communication': 'pod-to-pod'
-                            })
-            
-            # Update service with endpoint count
-            for node in nodes:
-                if node['id'] == svc_id:
-                    node['endpoints'] = pod_count
-                    node['connected_pods'] = connected_pods
-                    break
         
         # Layer 7: Ingress (External Access & L7 Load Balancing)
         for ing in ingresses:
@@ -300,16 +321,49 @@ class TopologyBuilder:
                     if svc_id:
                         edges.append({'source': ing_id, 'target': svc_id, 'type': 'routes', 'path': rule.get('path', '/'), 'layer': 'ingress'})
         
-        result = {'nodes': nodes, 'edges': edges}
-        
-        # Cache the result
-        self._cache = result
-        self._cache_time = time.time()
-        logger.info(f"Topology built: {len(nodes)} nodes, {len(edges)} edges")
-        
-        return result
+        return {'nodes': nodes, 'edges': edges}
+
+# Label selector index over informer pods, maintained by the engine and shared with the builder
+pod_label_index = LabelIndex()
+
+def pod_selector_index(pods):
+    """Return the shared pod label index, or a one-off index until the engine has the pod list"""
+    if topology_engine.has_synced('pods'):
+        return pod_label_index
+    return LabelIndex(pods)
+
+topology = TopologyBuilder(skip_inactive_replicasets=TOPOLOGY_SKIP_INACTIVE_RS, pod_index=pod_selector_index)
 
-topology = TopologyBuilder()
+# Incremental topology fed by watch informers; /ws/topology streams its deltas
+DELTA_WINDOW = 0.5  # seconds of events coalesced into one delta
+topology_engine = TopologyEngine(topology, label_index=pod_label_index)
+topology_informers = [
+    ResourceInformer('namespaces', v1.list_namespace),
+    ResourceInformer('nodes', v1.list_node),
+    ResourceInformer('pods', v1.list_pod_for_all_namespaces),
+    ResourceInformer('replicasets', apps_v1.list_replica_set_for_all_namespaces),
+    ResourceInformer('deployments', apps_v1.list_deployment_for_all_namespaces),
+    ResourceInformer('services', v1.list_service_for_all_namespaces),
+    ResourceInformer('ingresses', net_v1.list_ingress_for_all_namespaces)
+]
+for informer in topology_informers:
+    informer.add_event_handler(topology_engine.handler(informer.kind))
+
+# Connected websocket clients, each with a bounded queue of pending deltas
+CLIENT_QUEUE_SIZE = 64
+RESYNC = None  # queued in place of deltas when a client falls behind
+topology_clients = set()
+
+def publish(message):
+    """Fan one delta out to every client queue without blocking the event loop"""
+    for queue in list(topology_clients):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow client: drop its backlog and send it a snapshot instead
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
 
 # Background cache warmer
 async def warm_cache():
@@ -318,31 +372,84 @@ async def warm_cache():
         try:
             await asyncio.sleep(25)  # Refresh every 25 seconds (before 30s TTL expires)
             logger.info("Background cache refresh")
-            topology.build_topology()
+            await asyncio.to_thread(topology.build_topology)
         except Exception as e:
             logger.error(f"Cache warm error: {e}")
 
+async def flush_topology():
+    """Coalesce watch events into one topology delta per window and publish it"""
+    while True:
+        await asyncio.sleep(DELTA_WINDOW)
+        try:
+            # The engine lock can be held by informer threads during a relist
+            delta = await asyncio.to_thread(topology_engine.flush)
+            if delta:
+                publish(delta)
+        except Exception as e:
+            logger.error(f"Topology flush error: {e}")
+
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks on startup"""
+    for informer in topology_informers:
+        informer.start()
+    asyncio.create_task(flush_topology())
     asyncio.create_task(warm_cache())
-    logger.info("Background cache warmer started")
+    logger.info("Background cache warmer and topology informers started")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for informer in topology_informers:
+        informer.stop()
 
 @app.get("/api/topology")
-async def get_topology():
-    return topology.build_topology()
+def get_topology(skip_inactive_replicasets: Optional[bool] = None):
+    # Plain def: FastAPI runs the blocking build in its threadpool
+    return topology.build_topology(skip_inactive_replicasets)
+
+async def send_topology(websocket: WebSocket, queue):
+    """Send one snapshot, then the queued deltas, until the connection fails"""
+    try:
+        message = RESYNC
+        seq = 0
+        while True:
+            if message is RESYNC:
+                snapshot = await asyncio.to_thread(topology_engine.snapshot)
+                seq = snapshot['seq']
+                await websocket.send_json(snapshot)
+            elif message['seq'] > seq:
+                # Deltas already covered by the snapshot are skipped
+                await websocket.send_json(message)
+                seq = message['seq']
+            message = await queue.get()
+    except Exception:
+        pass
+
+async def wait_for_disconnect(websocket: WebSocket):
+    """Return when the client goes away; anything it sends is ignored"""
+    try:
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+    except Exception:
+        pass
 
 @app.websocket("/ws/topology")
 async def ws_topology(websocket: WebSocket):
+    """Send one snapshot, then sequence-numbered deltas as the graph changes"""
     await websocket.accept()
-    await websocket.send_json(topology.build_topology())
-    
+    queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    topology_clients.add(queue)
+    # Also wait on the receive side, so a disconnect unsubscribes at once rather than at the next send
+    tasks = {asyncio.create_task(send_topology(websocket, queue)),
+             asyncio.create_task(wait_for_disconnect(websocket))}
     try:
-        w = watch.Watch()
-        for event in w.stream(v1.list_pod_for_all_namespaces, timeout_seconds=30):
-            await websocket.send_json(topology.build_topology())
-    except:
-        pass
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        topology_clients.discard(queue)
+        for task in tasks:
+            task.cancel()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,374 @@
+"""
+Incremental topology engine.
+
+Watch events are applied to a versioned graph as node/edge patches instead
+of rebuilding the whole topology. Patches collected between flushes are
+coalesced into one sequence-numbered delta. Clients apply deltas in
+sequence order and ask for a new snapshot when they miss one.
+
+Node ids are stable across events ("pod:<namespace>/<name>", "svc:...",
+"node:<name>", ...) so a delta can refer to nodes from earlier messages.
+"""
+
+import threading
+
+from cluster_cache import object_key
+from label_index import LabelIndex
+from owner_index import is_inactive_replicaset
+
+ID_PREFIXES = {
+    'namespaces': 'ns',
+    'nodes': 'node',
+    'pods': 'pod',
+    'replicasets': 'rs',
+    'deployments': 'deploy',
+    'services': 'svc',
+    'ingresses': 'ing'
+}
+
+# Dependent fragments are recomputed in this order after a full resync
+KINDS = tuple(ID_PREFIXES)
+
+
+def node_id(kind, key):
+    return f"{ID_PREFIXES[kind]}:{key}"
+
+
+def make_edge(source, target, edge_type, **attrs):
+    edge = {'id': f"{source}->{target}:{edge_type}", 'source': source, 'target': target, 'type': edge_type}
+    edge.update(attrs)
+    return edge
+
+
+class TopologyEngine:
+    """Versioned topology graph maintained from watch events"""
+
+    def __init__(self, builder, label_index=None):
+        # builder supplies the node payload helpers shared with TopologyBuilder
+        self.builder = builder
+        self._lock = threading.RLock()
+        self._objects = {kind: {} for kind in KINDS}      # kind -> key -> object
+        self._by_namespace = {kind: {} for kind in KINDS}  # kind -> namespace -> keys
+        self._uids = {}                                    # uid -> (kind, key)
+        self._children = {}                                # owner uid -> {(kind, key)}
+        # Kept in step with the pods applied here; may be shared with TopologyBuilder
+        self.label_index = label_index if label_index is not None else LabelIndex()
+
+        self._nodes = {}         # node id -> node
+        self._edges = {}         # edge id -> edge
+        self._owned_edges = {}   # node id -> edge ids produced by that object's fragment
+
+        self._pending_nodes = {}  # node id -> node, or None when removed
+        self._pending_edges = {}  # edge id -> edge, or None when removed
+        self.version = 0
+        self._synced = set()     # kinds whose full list has been applied
+
+    def has_synced(self, kind):
+        return kind in self._synced
+
+    def handler(self, kind):
+        """Return a cluster cache / informer event handler for one kind"""
+        return lambda event_type, obj: self.apply(kind, event_type, obj)
+
+    # ---- Event application -------------------------------------------------
+
+    def apply(self, kind, event_type, obj):
+        with self._lock:
+            if event_type == 'SYNC':
+                self._replace(kind, obj)
+                self._synced.add(kind)
+                return
+
+            key = object_key(obj)
+            old = self._objects[kind].get(key)
+            if event_type == 'DELETED':
+                self._forget(kind, key)
+                new = None
+            else:
+                self._remember(kind, key, obj)
+                new = obj
+
+            dirty = {(kind, key)}
+            dirty |= self._dependents(kind, old, new)
+            for dirty_kind, dirty_key in dirty:
+                self._recompute(dirty_kind, dirty_key)
+
+    def _replace(self, kind, objects):
+        store = self._objects[kind]
+        fresh = {object_key(obj): obj for obj in objects}
+        for key in list(store):
+            if key not in fresh:
+                self._forget(kind, key)
+        for key, obj in fresh.items():
+            self._remember(kind, key, obj)
+        # A relist can change any relationship, so recompute everything and
+        # let the fragment diff keep the resulting delta minimal
+        for each_kind in KINDS:
+            for key in list(self._objects[each_kind]):
+                self._recompute(each_kind, key)
+        for nid in [nid for nid in self._nodes if not self._exists(nid)]:
+            self._set_fragment(nid, None, [])
+
+    def _exists(self, nid):
+        prefix, key = nid.split(':', 1)
+        for kind, kind_prefix in ID_PREFIXES.items():
+            if kind_prefix == prefix:
+                return key in self._objects[kind]
+        return False
+
+    def _remember(self, kind, key, obj):
+        self._forget(kind, key)
+        self._objects[kind][key] = obj
+        namespace = obj.metadata.namespace
+        if namespace:
+            self._by_namespace[kind].setdefault(namespace, set()).add(key)
+        if obj.metadata.uid:
+            self._uids[obj.metadata.uid] = (kind, key)
+        for ref in obj.metadata.owner_references or []:
+            self._children.setdefault(ref.uid, set()).add((kind, key))
+        if kind == 'pods':
+            self.label_index.upsert(obj)
+
+    def _forget(self, kind, key):
+        obj = self._objects[kind].pop(key, None)
+        if obj is None:
+            return
+        namespace = obj.metadata.namespace
+        if namespace:
+            keys = self._by_namespace[kind].get(namespace)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_namespace[kind][namespace]
+        if obj.metadata.uid and self._uids.get(obj.metadata.uid) == (kind, key):
+            del self._uids[obj.metadata.uid]
+        for ref in obj.metadata.owner_references or []:
+            children = self._children.get(ref.uid)
+            if children:
+                children.discard((kind, key))
+                if not children:
+                    del self._children[ref.uid]
+        if kind == 'pods':
+            self.label_index.remove(obj)
+
+    def _dependents(self, kind, old, new):
+        """Return (kind, key) of other objects whose fragment depends on this change"""
+        dependents = set()
+        either = new or old
+        if either is None:
+            return dependents
+        existence_changed = old is None or new is None
+        namespace = either.metadata.namespace
+
+        if kind == 'pods':
+            old_labels = (old.metadata.labels or {}) if old else {}
+            new_labels = (new.metadata.labels or {}) if new else {}
+            if existence_changed or old_labels != new_labels:
+                for svc_key in self._by_namespace['services'].get(namespace, ()):
+                    selector = self._objects['services'][svc_key].spec.selector
+                    if self._selects(selector, old_labels) or self._selects(selector, new_labels):
+                        dependents.add(('services', svc_key))
+        elif kind == 'nodes':
+            if existence_changed:
+                for pod_key, pod in self._objects['pods'].items():
+                    if pod.spec.node_name == either.metadata.name:
+                        dependents.add(('pods', pod_key))
+        elif kind in ('replicasets', 'deployments'):
+            dependents |= self._children.get(either.metadata.uid, set())
+        elif kind == 'services':
+            if existence_changed:
+                for ing_key in self._by_namespace['ingresses'].get(namespace, ()):
+                    dependents.add(('ingresses', ing_key))
+        return dependents
+
+    @staticmethod
+    def _selects(selector, labels):
+        if not selector or not labels:
+            return False
+        return all(labels.get(k) == v for k, v in selector.items())
+
+    # ---- Fragments -----------------------------------------------------------
+
+    def _visible(self, kind, obj):
+        if kind == 'replicasets' and self.builder.skip_inactive_replicasets:
+            return not is_inactive_replicaset(obj)
+        return True
+
+    def _owner_ids(self, obj, owner_kind):
+        """Return node ids of visible owners of a given kind"""
+        ids = []
+        for ref in obj.metadata.owner_references or []:
+            owner = self._uids.get(ref.uid)
+            if owner and owner[0] == owner_kind:
+                owner_obj = self._objects[owner_kind].get(owner[1])
+                if owner_obj is not None and self._visible(owner_kind, owner_obj):
+                    ids.append(node_id(owner_kind, owner[1]))
+        return ids
+
+    def _recompute(self, kind, key):
+        nid = node_id(kind, key)
+        obj = self._objects[kind].get(key)
+        if obj is None or not self._visible(kind, obj):
+            self._set_fragment(nid, None, [])
+            return
+        node, edges = getattr(self, f"_{kind}_fragment")(nid, obj)
+        self._set_fragment(nid, node, edges)
+
+    def _namespaces_fragment(self, nid, ns):
+        node = {
+            'id': nid, 'type': 'namespace', 'label': ns.metadata.name,
+            'status': ns.status.phase, 'health': 'healthy' if ns.status.phase == 'Active' else 'error',
+            'layer': 'namespace'
+        }
+        return node, []
+
+    def _nodes_fragment(self, nid, k8s_node):
+        node_ready = False
+        for condition in k8s_node.status.conditions or []:
+            if condition.type == 'Ready':
+                node_ready = condition.status == 'True'
+        node = {
+            'id': nid, 'type': 'node', 'label': k8s_node.metadata.name,
+            'status': 'Ready' if node_ready else 'NotReady',
+            'health': 'healthy' if node_ready else 'error',
+            'addresses': [addr.address for addr in (k8s_node.status.addresses or [])],
+            'layer': 'infrastructure'
+        }
+        return node, []
+
+    def _pods_fragment(self, nid, pod):
+        queue_metrics = self.builder.get_pod_queue_metrics(pod)
+        node = {
+            'id': nid, 'type': 'pod', 'label': pod.metadata.name,
+            'namespace': pod.metadata.namespace, 'status': pod.status.phase,
+            'health': self.builder.get_health('pod', pod.status), 'ip': pod.status.pod_ip,
+            'node': pod.spec.node_name, 'labels': pod.metadata.labels or {},
+            'restarts': queue_metrics['restarts'], 'queued': queue_metrics['queued'],
+            'queue_size': queue_metrics['queue_size'], 'queue_reasons': queue_metrics['queue_reasons'],
+            'error_reasons': queue_metrics['error_reasons'], 'layer': 'workload'
+        }
+        edges = []
+        if pod.spec.node_name and pod.spec.node_name in self._objects['nodes']:
+            edges.append(make_edge(nid, node_id('nodes', pod.spec.node_name), 'scheduled_on', layer='infrastructure'))
+        for rs_id in self._owner_ids(pod, 'replicasets'):
+            edges.append(make_edge(rs_id, nid, 'manages', layer='workload'))
+        return node, edges
+
+    def _replicasets_fragment(self, nid, rs):
+        node = {
+            'id': nid, 'type': 'replicaset', 'label': rs.metadata.name,
+            'namespace': rs.metadata.namespace, 'replicas': rs.spec.replicas,
+            'ready': rs.status.ready_replicas or 0, 'selector': rs.spec.selector.match_labels or {},
+            'layer': 'workload'
+        }
+        edges = [make_edge(deploy_id, nid, 'manages', layer='workload')
+                 for deploy_id in self._owner_ids(rs, 'deployments')]
+        return node, edges
+
+    def _deployments_fragment(self, nid, deploy):
+        node = {
+            'id': nid, 'type': 'deployment', 'label': deploy.metadata.name,
+            'namespace': deploy.metadata.namespace, 'replicas': deploy.spec.replicas,
+            'ready': deploy.status.ready_replicas or 0, 'health': self.builder.get_health('deployment', deploy.status),
+            'selector': deploy.spec.selector.match_labels or {}, 'layer': 'workload'
+        }
+        return node, []
+
+    def _services_fragment(self, nid, svc):
+        svc_info = self.builder.get_service_type_info(svc)
+        protocols = sorted(set(p.protocol for p in (svc.spec.ports or [])))
+        connected_pods = []
+        edges = []
+        for pod in self.label_index.select(svc.metadata.namespace, svc.spec.selector):
+            connected_pods.append(pod.metadata.name)
+            edges.append(make_edge(nid, node_id('pods', object_key(pod)), 'routes', layer='network',
+                                   protocols=protocols, communication='pod-to-pod'))
+        node = {
+            'id': nid, 'type': 'service', 'label': svc.metadata.name,
+            'namespace': svc.metadata.namespace, 'svc_type': svc.spec.type,
+            'cluster_ip': svc.spec.cluster_ip, 'selector': svc.spec.selector or {},
+            'ports': [{'port': p.port, 'target': p.target_port, 'protocol': p.protocol, 'node_port': getattr(p, 'node_port', None)} for p in (svc.spec.ports or [])],
+            'external_access': svc_info['external_access'], 'external_ip': svc_info['external_ip'],
+            'endpoints': len(connected_pods), 'connected_pods': sorted(connected_pods),
+            'layer': 'network'
+        }
+        return node, edges
+
+    def _ingresses_fragment(self, nid, ing):
+        rules = []
+        if ing.spec.rules:
+            for rule in ing.spec.rules:
+                if rule.http and rule.http.paths:
+                    for path in rule.http.paths:
+                        svc_name = path.backend.service.name if path.backend.service else None
+                        rules.append({'host': rule.host, 'path': path.path, 'service': svc_name})
+        node = {
+            'id': nid, 'type': 'ingress', 'label': ing.metadata.name,
+            'namespace': ing.metadata.namespace, 'rules': rules,
+            'layer': 'ingress'
+        }
+        edges = {}
+        for rule in rules:
+            svc_key = f"{ing.metadata.namespace}/{rule['service']}"
+            if rule['service'] and svc_key in self._objects['services']:
+                path = rule.get('path') or '/'
+                edge = make_edge(nid, node_id('services', svc_key), 'routes', path=path, layer='ingress')
+                edge['id'] = f"{edge['id']}:{path}"
+                edges.setdefault(edge['id'], edge)
+        return node, list(edges.values())
+
+    def _set_fragment(self, nid, node, edges):
+        """Replace one object's node and owned edges, recording the differences"""
+        if node is None:
+            if self._nodes.pop(nid, None) is not None:
+                self._pending_nodes[nid] = None
+        elif self._nodes.get(nid) != node:
+            self._nodes[nid] = node
+            self._pending_nodes[nid] = node
+
+        new_ids = {edge['id'] for edge in edges}
+        for eid in self._owned_edges.get(nid, set()) - new_ids:
+            if self._edges.pop(eid, None) is not None:
+                self._pending_edges[eid] = None
+        for edge in edges:
+            if self._edges.get(edge['id']) != edge:
+                self._edges[edge['id']] = edge
+                self._pending_edges[edge['id']] = edge
+        if new_ids:
+            self._owned_edges[nid] = new_ids
+        else:
+            self._owned_edges.pop(nid, None)
+
+    # ---- Output --------------------------------------------------------------
+
+    def flush(self):
+        """Turn pending patches into one delta; returns None when nothing changed"""
+        with self._lock:
+            if not self._pending_nodes and not self._pending_edges:
+                return None
+            self.version += 1
+            delta = {
+                'type': 'delta',
+                'seq': self.version,
+                'nodes': {
+                    'upsert': [node for node in self._pending_nodes.values() if node is not None],
+                    'remove': [nid for nid, node in self._pending_nodes.items() if node is None]
+                },
+                'edges': {
+                    'upsert': [edge for edge in self._pending_edges.values() if edge is not None],
+                    'remove': [eid for eid, edge in self._pending_edges.items() if edge is None]
+                }
+            }
+            self._pending_nodes = {}
+            self._pending_edges = {}
+            return delta
+
+    def snapshot(self):
+        """Return the full graph tagged with the latest flushed sequence number"""
+        with self._lock:
+            return {
+                'type': 'snapshot',
+                'seq': self.version,
+                'nodes': list(self._nodes.values()),
+                'edges': list(self._edges.values())
+            }